@@ -0,0 +1,124 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Set per request by backend.middleware.ReplicaRoutingMiddleware
+replica_reads = ContextVar("replica_reads", default=False)
+# Users whose reads the middleware pins to the primary after the request
+pinned_users = ContextVar("pinned_users", default=None)
+
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def routing_options():
+    return {
+        "STICKY_SECONDS": 10,
+        "MAX_LAG_SECONDS": 5,
+        "HEALTH_CHECK_INTERVAL": 5,
+        "PIN_HEADER": "X-Replica-Pin",
+        **getattr(settings, "REPLICA_ROUTING", {}),
+    }
+
+
+def pin_user(user_id):
+    """
+    Pin ``user_id``'s reads to the primary once the current request is done,
+    e.g. when a view hands out tokens to a client that didn't send any.
+    """
+    pinned = pinned_users.get()
+    if pinned is not None:
+        pinned.add(user_id)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+class ReplicaHealth:
+    """
+    Remembers, per process, whether each replica answered and how far behind
+    the primary it was at the last check. Checks run at most once per
+    ``HEALTH_CHECK_INTERVAL`` per replica.
+    """
+
+    def __init__(self):
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        options = routing_options()
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at = self._checked.get(alias, (False, None))
+            if checked_at is not None and now - checked_at < options["HEALTH_CHECK_INTERVAL"]:
+                return healthy
+            # Other threads keep the previous verdict while this one re-checks
+            self._checked[alias] = (healthy, now)
+
+        healthy = self.check(alias, options["MAX_LAG_SECONDS"])
+        with self._lock:
+            self._checked[alias] = (healthy, now)
+        return healthy
+
+    def check(self, alias, max_lag):
+        try:
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                if connection.vendor == "postgresql":
+                    cursor.execute(POSTGRES_LAG_SQL)
+                    lag = float(cursor.fetchone()[0])
+                else:
+                    cursor.execute("SELECT 1")
+                    lag = 0.0
+        except Exception:
+            logger.warning("Replica %s is unreachable, reading from the primary", alias, exc_info=True)
+            return False
+
+        if lag > max_lag:
+            logger.warning("Replica %s is %.1fs behind, reading from the primary", alias, lag)
+            return False
+        return True
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a healthy replica while the current request allows it
+    (see ``replica_reads``) and everything else to ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get() or connections["default"].in_atomic_block:
+            return None
+
+        candidates = replica_aliases()
+        random.shuffle(candidates)
+        for alias in candidates:
+            if replica_health.is_healthy(alias):
+                return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas are copies of the primary, so every object lives in one database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
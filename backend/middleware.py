@@ -0,0 +1,174 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.core import signing
+from django.middleware import csrf
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from .db_router import pinned_users, replica_aliases, replica_reads, routing_options
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise is sync-only, which makes Django run everything below it in a
+    worker thread under ASGI. This variant serves static files the same way
+    but hands every other request straight to the async chain.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+def request_user_id(request):
+    """The user id in the request's bearer token, or None if it has no valid one."""
+    header = request.META.get("HTTP_AUTHORIZATION", "").split()
+    if len(header) != 2 or header[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1])[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe (GET/HEAD/OPTIONS) requests read from a replica.
+
+    After a write, the response carries a signed, timestamped pin in the
+    ``PIN_HEADER`` header. Clients echo it on their next requests and, for
+    ``STICKY_SECONDS`` after it was issued, those read from the primary so
+    they see their own changes despite replication lag. Responses that hand
+    out tokens are pinned too (see db_router.pin_user). The pin lives with
+    the client, so checking it needs no shared state and no query.
+    """
+
+    async_capable = True
+    sync_capable = True
+    signer = signing.TimestampSigner(salt="backend.middleware.replica-pin")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(replica_aliases())
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def is_pinned(self, request):
+        options = routing_options()
+        value = request.headers.get(options["PIN_HEADER"])
+        if not value:
+            return False
+        try:
+            self.signer.unsign(value, max_age=options["STICKY_SECONDS"])
+        except signing.BadSignature:  # also raised once the pin has expired
+            return False
+        return True
+
+    def use_replica(self, request):
+        return request.method in SAFE_METHODS and not self.is_pinned(request)
+
+    def pin(self, request, response, pinned):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            user = getattr(request, "user", None)
+            user_id = user.pk if user is not None and user.is_authenticated else request_user_id(request)
+            pinned.add(user_id or "")
+        if pinned:
+            value = ",".join(sorted(str(pk) for pk in pinned))
+            response[routing_options()["PIN_HEADER"]] = self.signer.sign(value)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        pinned = set()
+        reads_token = replica_reads.set(self.use_replica(request))
+        pins_token = pinned_users.set(pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(reads_token)
+            pinned_users.reset(pins_token)
+        self.pin(request, response, pinned)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        pinned = set()
+        reads_token = replica_reads.set(self.use_replica(request))
+        pins_token = pinned_users.set(pinned)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads.reset(reads_token)
+            pinned_users.reset(pins_token)
+        self.pin(request, response, pinned)
+        return response
+
+
+# ----------------------------------------------------------------------
+# Path-scoped variants of the session-based middleware
+# ----------------------------------------------------------------------
+# The /api/ views authenticate with JWT and never touch sessions, messages
+# or CSRF cookies, so these are skipped for paths under API_PATH_PREFIXES
+# while /admin/ keeps the full stack.
+
+def is_api_request(request):
+    return request.path_info.startswith(tuple(getattr(settings, "API_PATH_PREFIXES", ("/api/",))))
+
+
+class APIExemptMixin:
+    def __call__(self, request):
+        if is_api_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(APIExemptMixin, sessions_middleware.SessionMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(APIExemptMixin, auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(APIExemptMixin, messages_middleware.MessageMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(APIExemptMixin, csrf.CsrfViewMiddleware):
+    # process_view is invoked by the handler directly, not through __call__
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
@@ -1,5 +1,6 @@
 import os
 import dj_database_url
+from corsheaders.defaults import default_headers
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -43,17 +44,22 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "backend.middleware.WhiteNoiseMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "sellers.profiling.ProfilingMiddleware",
+    "backend.middleware.ReplicaRoutingMiddleware",
+    "backend.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
+    "backend.middleware.CsrfViewMiddleware",
 
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "backend.middleware.AuthenticationMiddleware",
+    "backend.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Session, auth, messages and CSRF middleware are skipped for these paths
+API_PATH_PREFIXES = ("/api/",)
+
 ROOT_URLCONF = "backend.urls"
 
 # -------------------------------------------------------------------
@@ -82,17 +88,63 @@ WSGI_APPLICATION = "backend.wsgi.application"
 # DATABASE
 # -------------------------------------------------------------------
 
+# Served under ASGI, where sync views run in per-request executor threads
+# and each would keep its own persistent connection open against Neon's
+# connection limit, so connections are closed after every request. WSGI
+# deployments can raise this with DB_CONN_MAX_AGE.
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "0"))
 
 DATABASES = {
     "default": dj_database_url.parse(
         os.getenv("DATABASE_URL"),
-        conn_max_age=600,
+        conn_max_age=DB_CONN_MAX_AGE,
         ssl_require=True
     )
 }
 
+# Optional read replicas, e.g. DATABASE_REPLICA_URLS="postgres://...,postgres://..."
+for index, url in enumerate(filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(","))):
+    DATABASES[f"replica_{index}"] = {
+        **dj_database_url.parse(url, conn_max_age=DB_CONN_MAX_AGE, ssl_require=True),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["backend.db_router.ReplicaRouter"]
+
+REPLICA_ROUTING = {
+    "STICKY_SECONDS": 10,
+    "MAX_LAG_SECONDS": 5,
+    "HEALTH_CHECK_INTERVAL": 5,
+    # Signed read-your-writes pin the client echoes back after a write
+    "PIN_HEADER": "X-Replica-Pin",
+}
+
 
 
+# -------------------------------------------------------------------
+# CACHES
+# -------------------------------------------------------------------
+
+# Stored idempotent responses live in the IdempotencyKey table. Their
+# hit/miss counters must be shared by all workers, so they live in a
+# database cache (create the table with `manage.py createcachetable`).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "idempotency": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "idempotency_cache",
+    },
+}
+
+IDEMPOTENCY = {
+    "CACHE": "idempotency",
+    "TTL": 24 * 60 * 60,
+    "LOCK_TIMEOUT": 60,
+    "WAIT_TIMEOUT": 10,
+}
+
 # -------------------------------------------------------------------
 # PASSWORD VALIDATION
 # -------------------------------------------------------------------
@@ -120,6 +172,22 @@ DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 
 MEDIA_URL = "/media/"
 
+# Resumable uploads: chunks are staged locally and assembled on completion
+CHUNKED_UPLOAD = {
+    "BACKEND": "sellers.utils.chunked_upload.LocalChunkStore",
+    "ROOT": os.getenv("CHUNKED_UPLOAD_ROOT"),
+    "CHUNK_SIZE": 1024 * 1024,
+    "MAX_SIZE": 50 * 1024 * 1024,
+    # A complete that hasn't finished after this long is presumed dead
+    "CLAIM_TIMEOUT": 15 * 60,
+}
+
+# Resolved document URLs are memoized per process
+DOCUMENT_URL_CACHE = {
+    "MAXSIZE": 10_000,
+    "TTL": 60 * 60,
+}
+
 # -------------------------------------------------------------------
 # CLOUDINARY CONFIG
 # -------------------------------------------------------------------
@@ -143,17 +211,32 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Browsers may only read and resend the replica pin if CORS allows it
+CORS_ALLOW_HEADERS = (*default_headers, "x-replica-pin")
+CORS_EXPOSE_HEADERS = ["X-Replica-Pin"]
+
 # -------------------------------------------------------------------
 # REST FRAMEWORK + JWT
 # -------------------------------------------------------------------
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "sellers.authentication.RevocableJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "sellers.renderers.FastJSONRenderer",
+        "sellers.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "sellers.renderers.FastJSONParser",
+        "sellers.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 SIMPLE_JWT = {
@@ -164,6 +247,101 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Revoked tokens are tracked per user (token version) in a per-process Bloom
+# filter that each worker re-syncs from the database every SYNC_INTERVAL
+# seconds; see sellers/revocation.py.
+TOKEN_REVOCATION = {
+    "CAPACITY": 100_000,
+    "ERROR_RATE": 0.001,
+    "SYNC_INTERVAL": 5,
+    "SYNC_OVERLAP": 60,
+    "REBUILD_INTERVAL": 60 * 60,
+    "CACHE_SIZE": 10_000,
+    # A refresh token presented again within this many seconds of rotating
+    # is treated as a client retry instead of theft
+    "REUSE_GRACE": 30,
+}
+
+# -------------------------------------------------------------------
+# SELLER STATUS EVENTS (SSE / long-poll)
+# -------------------------------------------------------------------
+
+# Use "sellers.events.PostgresStatusBroker" when running more than one worker
+STATUS_EVENTS = {
+    "BACKEND": os.getenv("STATUS_EVENTS_BACKEND", "sellers.events.InMemoryStatusBroker"),
+    "CHANNEL": "seller_status",
+    "HEARTBEAT": 15,
+    "STREAM_TIMEOUT": 300,
+    "LONG_POLL_TIMEOUT": 25,
+    "RETRY_MS": 3000,
+}
+
+# -------------------------------------------------------------------
+# PUSH NOTIFICATIONS (Firebase Cloud Messaging)
+# -------------------------------------------------------------------
+
+PUSH_NOTIFICATIONS = {
+    "ENABLED": bool(os.getenv("FIREBASE_CREDENTIALS_PATH")),
+    "TRANSPORT": "sellers.notifications.FirebaseTransport",
+    "BATCH_SIZE": 500,
+    "FLUSH_INTERVAL": 1.0,
+    # Sends that raise are retried after 2s, 4s, 8s... up to MAX_ATTEMPTS in all
+    "MAX_ATTEMPTS": 5,
+    "RETRY_BACKOFF": 2.0,
+}
+
+# -------------------------------------------------------------------
+# MAINTENANCE (expired OTPs, revoked tokens, stale uploads...)
+# -------------------------------------------------------------------
+# Run "manage.py run_maintenance" from cron, or set MAINTENANCE_SCHEDULER=1
+# to run it from a thread in each web worker (only one runs at a time).
+
+MAINTENANCE = {
+    "SCHEDULER": os.getenv("MAINTENANCE_SCHEDULER") == "1",
+    "INTERVAL": 10 * 60,
+    "BATCH_SIZE": 1000,
+    "BATCH_PAUSE": 0.05,
+    "OTP_GRACE": timedelta(days=1),
+    "UPLOAD_SESSION_TTL": timedelta(days=2),
+    "COMPLETED_UPLOAD_TTL": timedelta(days=30),
+    "DEVICE_TOKEN_TTL": timedelta(days=270),
+    "RUN_HISTORY_TTL": timedelta(days=14),
+}
+
+# Account deletion runs as a background job (sellers/deletion.py); failed or
+# interrupted jobs are retried by the maintenance runner.
+DELETION = {
+    "CHUNK_SIZE": 500,
+    "STORAGE_BATCH_SIZE": 100,  # Cloudinary's limit per delete_resources call
+    "STORAGE_CONCURRENCY": 8,
+    "RETRIES": 3,
+    "RETRY_BACKOFF": 0.5,
+    "MAX_ATTEMPTS": 5,
+    "STALE_AFTER": 15 * 60,
+    "MAX_FAILED_FILES": 1000,
+}
+
+# -------------------------------------------------------------------
+# REQUEST PROFILING (opt-in)
+# -------------------------------------------------------------------
+# With PROFILING_ENABLED=1 a request is profiled when it carries a signed
+# X-Profile-Token header (minted at /api/admin/profiles/token/), when it is
+# sampled, or when it takes longer than SLOW_MS. Disabled, the middleware
+# removes itself from the stack.
+
+PROFILING = {
+    "ENABLED": os.getenv("PROFILING_ENABLED") == "1",
+    "ROOT": os.getenv("PROFILING_ROOT"),
+    "MAX_PROFILES": 200,
+    "SAMPLE_RATE": float(os.getenv("PROFILING_SAMPLE_RATE", "0")),
+    "SLOW_MS": int(os.getenv("PROFILING_SLOW_MS")) if os.getenv("PROFILING_SLOW_MS") else None,
+    # Long-polls and streams are slow by design
+    "SLOW_EXCLUDE": ("seller_status_stream", "seller_status_poll"),
+    "SAMPLE_INTERVAL": 0.005,
+    "TOKEN_MAX_AGE": 60 * 60,
+    "MAX_QUERIES": 1000,
+}
+
 # -------------------------------------------------------------------
 # EMAIL SETTINGS (Works with Gmail / SMTP)
 # -------------------------------------------------------------------
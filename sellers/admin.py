@@ -1,12 +1,60 @@
 from django.contrib import admin
-from .models import SellerProfile, Document
+from django.db import transaction
+from .deletion import users_pending_deletion
+from .models import SellerProfile, Document, StatusTransition, MaintenanceRun, DeletionJob
 
 @admin.register(SellerProfile)
 class SellerProfileAdmin(admin.ModelAdmin):
     list_display = ("factory_name", "user", "status")
     search_fields = ("factory_name", "user__username")
+    actions = ("approve_selected", "reject_selected")
+
+    def set_status(self, request, queryset, status):
+        # Saved one by one so history, counters and notifications see each
+        # change. Sellers whose account is being deleted are left alone.
+        with transaction.atomic():
+            for profile in queryset.exclude(user_id__in=users_pending_deletion()).select_for_update():
+                profile.status = status
+                profile._status_actor = request.user
+                profile.save()
+
+    @admin.action(description="Approve selected sellers")
+    def approve_selected(self, request, queryset):
+        self.set_status(request, queryset, "approved")
+
+    @admin.action(description="Reject selected sellers")
+    def reject_selected(self, request, queryset):
+        self.set_status(request, queryset, "rejected")
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display = ("seller", "doc_type", "uploaded_at")
     readonly_fields = ("uploaded_at",)
+
+@admin.register(StatusTransition)
+class StatusTransitionAdmin(admin.ModelAdmin):
+    list_display = ("seller", "from_status", "to_status", "changed_by", "created_at")
+    list_filter = ("to_status",)
+    readonly_fields = ("seller", "from_status", "to_status", "admin_comment", "changed_by", "created_at")
+
+    # The history is written by the status signal only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(MaintenanceRun)
+class MaintenanceRunAdmin(admin.ModelAdmin):
+    list_display = ("task", "rows", "batches", "duration", "started_at")
+    list_filter = ("task",)
+    readonly_fields = ("task", "rows", "batches", "duration", "started_at")
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ("username", "status", "documents_deleted", "documents_total", "files_failed", "attempts", "created_at")
+    list_filter = ("status",)
+    readonly_fields = [field.name for field in DeletionJob._meta.fields]
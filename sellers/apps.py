@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class SellerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sellers'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from . import signals  # noqa: F401
+        from .maintenance import SCHEDULER_DISPATCH_UID, get_options, start_scheduler
+
+        if get_options()["SCHEDULER"]:
+            request_started.connect(start_scheduler, dispatch_uid=SCHEDULER_DISPATCH_UID)
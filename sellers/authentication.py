@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .revocation import get_revocation_list
+
+
+class RevocableJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that also rejects tokens revoked through sellers.revocation."""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if get_revocation_list().is_revoked(validated_token):
+            raise InvalidToken("Token has been revoked")
+        return validated_token
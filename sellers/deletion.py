@@ -0,0 +1,259 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from cloudinary_storage.storage import MediaCloudinaryStorage
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DeletionJob, Document, UploadSession
+from .utils.chunked_upload import get_chunk_store
+
+logger = logging.getLogger(__name__)
+
+
+def get_options():
+    return {
+        "CHUNK_SIZE": 500,
+        "STORAGE_BATCH_SIZE": 100,
+        "STORAGE_CONCURRENCY": 8,
+        "RETRIES": 3,
+        "RETRY_BACKOFF": 0.5,
+        "MAX_ATTEMPTS": 5,
+        "STALE_AFTER": 15 * 60,
+        "MAX_FAILED_FILES": 1000,
+        **getattr(settings, "DELETION", {}),
+    }
+
+
+# ======================================================================
+# STORAGE
+# ======================================================================
+
+def delete_cloudinary(storage, names):
+    """One Admin API call per resource type for up to 100 public ids."""
+    import cloudinary.api
+
+    by_type = defaultdict(list)
+    for name in names:
+        by_type[storage._get_resource_type(name)].append(name)
+
+    failed = []
+    for resource_type, public_ids in by_type.items():
+        try:
+            response = cloudinary.api.delete_resources(public_ids, resource_type=resource_type, invalidate=True)
+        except Exception:
+            logger.warning("Cloudinary bulk delete of %d files failed", len(public_ids), exc_info=True)
+            failed.extend(public_ids)
+            continue
+        deleted = response.get("deleted", {})
+        failed.extend(pid for pid in public_ids if deleted.get(pid) not in ("deleted", "not_found"))
+    return failed
+
+
+def bulk_deleter(storage):
+    """
+    A ``delete(names) -> failed names`` callable for storages that can delete
+    many files per call, or None. Any storage may opt in by defining
+    ``delete_many``.
+    """
+    if hasattr(storage, "delete_many"):
+        return storage.delete_many
+    if isinstance(storage, MediaCloudinaryStorage):
+        return lambda names: delete_cloudinary(storage, names)
+    return None
+
+
+def delete_one_by_one(storage, names):
+    failed = []
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.debug("Deleting %s from storage failed", name, exc_info=True)
+            failed.append(name)
+    return failed
+
+
+def delete_files(pool, storage, names, options):
+    """
+    Delete ``names`` from ``storage`` on ``pool``: in bulk calls of
+    STORAGE_BATCH_SIZE where the storage supports it, one call per file
+    otherwise. Failures are retried RETRIES times with exponential backoff.
+    Returns the names that still could not be deleted.
+    """
+    delete = bulk_deleter(storage)
+    batch_size = options["STORAGE_BATCH_SIZE"] if delete else 1
+    if delete is None:
+        delete = lambda batch: delete_one_by_one(storage, batch)  # noqa: E731
+
+    def attempt(batch):
+        for retry in range(options["RETRIES"] + 1):
+            if retry:
+                time.sleep(options["RETRY_BACKOFF"] * 2 ** (retry - 1))
+            batch = delete(batch)
+            if not batch:
+                break
+        return batch
+
+    batches = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+    return [name for failed in pool.map(attempt, batches) for name in failed]
+
+
+# ======================================================================
+# JOB
+# ======================================================================
+
+def claim(job_id, options):
+    """Mark the job running unless another runner is actively working on it."""
+    now = timezone.now()
+    runnable = Q(status__in=("queued", "failed")) | Q(status="running", updated_at__lt=now - timedelta(seconds=options["STALE_AFTER"]))
+    return DeletionJob.objects.filter(runnable, pk=job_id, attempts__lt=options["MAX_ATTEMPTS"]).update(
+        status="running",
+        attempts=F("attempts") + 1,
+        started_at=Coalesce("started_at", Value(now)),
+        updated_at=now,
+        error="",
+    )
+
+
+def run_deletion_job(job_id, options=None):
+    """
+    Delete the user's documents CHUNK_SIZE at a time -- files first, then
+    their rows, so no stored file is ever left without a row pointing at
+    it -- and finally the user and everything that cascades from it.
+
+    Rows whose file still can't be deleted after the retries are kept and
+    the job ends as failed, leaving the user in place, so a later run
+    (see resume_deletion_jobs) tries those files again. The user is only
+    deleted once no documents remain. Progress is saved after every chunk.
+    Returns the job, or None if it could not be claimed.
+    """
+    options = {**get_options(), **(options or {})}
+    if not claim(job_id, options):
+        return None
+
+    job = DeletionJob.objects.get(pk=job_id)
+    storage = Document._meta.get_field("file").storage
+    documents = Document.objects.filter(seller__user_id=job.user_id).order_by("pk")
+    progress = DeletionJob.objects.filter(pk=job.pk)
+
+    try:
+        # files_failed and failed_files describe the current attempt
+        progress.update(documents_total=F("documents_deleted") + documents.count(), files_failed=0, failed_files=[])
+        failed_files = []
+
+        with ThreadPoolExecutor(max_workers=options["STORAGE_CONCURRENCY"], thread_name_prefix="deletion") as pool:
+            last_pk = 0
+            while True:
+                rows = list(documents.filter(pk__gt=last_pk).values_list("pk", "file")[:options["CHUNK_SIZE"]])
+                if not rows:
+                    break
+                names = [name for _pk, name in rows if name]
+
+                failed = set(delete_files(pool, storage, names, options))
+                deleted = [pk for pk, name in rows if name not in failed]
+                with transaction.atomic():
+                    Document.objects.filter(pk__in=deleted).delete()
+                    progress.update(
+                        documents_deleted=F("documents_deleted") + len(deleted),
+                        files_deleted=F("files_deleted") + len(names) - len(failed),
+                        files_failed=F("files_failed") + len(failed),
+                        updated_at=timezone.now(),
+                    )
+                if failed:
+                    logger.warning("Deletion job %s: %d files could not be deleted", job.pk, len(failed))
+                    failed_files.extend(sorted(failed))
+                    progress.update(failed_files=failed_files[:options["MAX_FAILED_FILES"]])
+                last_pk = rows[-1][0]
+
+        remaining = documents.count()
+        if remaining:
+            progress.update(
+                status="failed",
+                error=f"{remaining} documents are left whose files could not be deleted",
+                updated_at=timezone.now(),
+            )
+        else:
+            staged = list(UploadSession.objects.filter(seller__user_id=job.user_id, status__in=("open", "assembling")).values_list("pk", flat=True))
+            User.objects.filter(pk=job.user_id).delete()
+            for session_id in staged:
+                get_chunk_store().discard(session_id)
+
+            progress.update(status="done", finished_at=timezone.now(), updated_at=timezone.now())
+    except Exception as exc:
+        logger.exception("Deletion job %s failed", job_id)
+        progress.update(status="failed", error=repr(exc)[:2000], updated_at=timezone.now())
+
+    job.refresh_from_db()
+    return job
+
+
+def resume_deletion_jobs(options=None):
+    """Run queued, failed and abandoned jobs; returns how many were run."""
+    options = {**get_options(), **(options or {})}
+    stale = timezone.now() - timedelta(seconds=options["STALE_AFTER"])
+    pending = DeletionJob.objects.filter(
+        Q(status__in=("queued", "failed")) | Q(status="running", updated_at__lt=stale),
+        attempts__lt=options["MAX_ATTEMPTS"],
+    ).order_by("created_at").values_list("pk", flat=True)
+    return sum(run_deletion_job(job_id, options) is not None for job_id in list(pending))
+
+
+def users_pending_deletion():
+    """Ids of users queued for deletion, as a subquery for ``user_id__in``."""
+    return DeletionJob.objects.exclude(status="done").values("user_id")
+
+
+def pending_deletion(user_id):
+    """True while the user is queued for deletion, e.g. to refuse reactivating them."""
+    return users_pending_deletion().filter(user_id=user_id).exists()
+
+
+# ======================================================================
+# BACKGROUND WORKER
+# ======================================================================
+
+class DeletionWorker:
+    """Runs submitted deletion jobs one at a time on a daemon thread."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, job_id):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="deletion-worker", daemon=True)
+                self._thread.start()
+        self._queue.put(job_id)
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                run_deletion_job(job_id)
+            except Exception:
+                logger.exception("Deletion job %s crashed", job_id)
+            finally:
+                connections.close_all()
+
+
+_worker = None
+
+
+def schedule_deletion(job):
+    """Start ``job`` in the background once the current transaction commits."""
+    global _worker
+    if _worker is None:
+        _worker = DeletionWorker()
+    transaction.on_commit(lambda: _worker.submit(job.pk))
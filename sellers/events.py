@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def _offer(queue, event):
+    # Each event carries the full current state, so a slow consumer only
+    # needs the newest one: drop whatever is still queued.
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class InMemoryStatusBroker:
+    """
+    Process-local pub/sub for seller status changes.
+
+    Subscribers are asyncio queues living on the ASGI event loop, while
+    publishers are usually sync views running in a worker thread, so
+    delivery goes through ``call_soon_threadsafe``.
+    """
+
+    def __init__(self, options=None):
+        self.options = options or {}
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            waiters = self._subscribers.get(user_id, set())
+            waiters.difference_update({w for w in waiters if w[1] is queue})
+            if not waiters:
+                self._subscribers.pop(user_id, None)
+
+    def waiting(self):
+        with self._lock:
+            return sum(len(w) for w in self._subscribers.values())
+
+    def deliver(self, user_id, event):
+        with self._lock:
+            waiters = list(self._subscribers.get(user_id, ()))
+        for loop, queue in waiters:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                self.unsubscribe(user_id, queue)  # loop already closed
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+
+class PostgresStatusBroker(InMemoryStatusBroker):
+    """
+    Fans status changes out to every worker process through Postgres
+    LISTEN/NOTIFY. Publishing only issues a NOTIFY; a single listener
+    thread per process delivers the notifications to local subscribers.
+    """
+
+    # NOTIFY payloads must stay below 8000 bytes
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, options=None):
+        super().__init__(options)
+        self.channel = self.options.get("CHANNEL", "seller_status")
+        self._listener = None
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id, event):
+        payload = json.dumps({"user_id": user_id, **event})
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            # Subscribers re-read the state themselves when it isn't included
+            payload = json.dumps({"user_id": user_id})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="status-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                # A dedicated connection, outside Django's per-thread handling
+                conn = connection.get_new_connection(connection.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        event = json.loads(notify.payload)
+                        self.deliver(event.pop("user_id"), event)
+            except Exception:
+                logger.exception("Status listener lost its connection, reconnecting")
+                time.sleep(5)
+
+
+_broker = None
+
+
+def get_status_broker():
+    global _broker
+    if _broker is None:
+        options = getattr(settings, "STATUS_EVENTS", {})
+        backend = import_string(options.get("BACKEND", "sellers.events.InMemoryStatusBroker"))
+        _broker = backend(options)
+    return _broker
+
+
+def publish_status(profile):
+    get_status_broker().publish(profile.user_id, {
+        "status": profile.status,
+        "admin_comment": profile.admin_comment,
+    })
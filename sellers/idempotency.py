@@ -0,0 +1,166 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+STATS = ("hits", "misses", "waits")
+
+
+def get_options():
+    return {
+        "CACHE": "default",
+        "TTL": 24 * 60 * 60,
+        "LOCK_TIMEOUT": 60,
+        "WAIT_TIMEOUT": 10,
+        "POLL_INTERVAL": 0.1,
+        **getattr(settings, "IDEMPOTENCY", {}),
+    }
+
+
+def count(cache, name):
+    key = f"idempotency:stats:{name}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:  # expired between add() and incr()
+            cache.add(key, 1, timeout=None)
+
+
+def idempotency_stats():
+    cache = caches[get_options()["CACHE"]]
+    stats = {name: cache.get(f"idempotency:stats:{name}", 0) for name in STATS}
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def request_scope(request):
+    """
+    Whose keys these are. Anonymous requests (signup, OTPs, password reset)
+    are scoped by the email they carry, or failing that by the client
+    address, so unrelated callers can't collide on a key.
+    """
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    email = request.data.get("email") if hasattr(request.data, "get") else None
+    if isinstance(email, str) and email.strip():
+        return f"email:{email.strip().lower()}"
+    return f"client:{request.META.get('REMOTE_ADDR')}"
+
+
+def request_fingerprint(request):
+    """SHA-256 of the method, path and parsed body; uploaded files count by content."""
+    digest = hashlib.sha256(f"{request.method}\0{request.path}\0".encode())
+    data = request.data
+    if not hasattr(data, "lists"):
+        digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    for name, values in sorted(data.lists(), key=lambda item: item[0]):
+        digest.update(f"\0{name}".encode())
+        for value in values:
+            if isinstance(value, UploadedFile):
+                digest.update(f"\0file:{value.name}:{value.size}\0".encode())
+                for chunk in value.chunks():
+                    digest.update(chunk)
+                value.seek(0)
+            else:
+                digest.update(f"\0{json.dumps(value, default=str)}".encode())
+    return digest.hexdigest()
+
+
+def claim(key, fingerprint, now, options):
+    """Record that a request for ``key`` is in flight; False if one already is."""
+    IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=options["LOCK_TIMEOUT"])
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def replay(record):
+    response = Response(record.data, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    """
+    Honour an ``Idempotency-Key`` header on a mutating DRF view.
+
+    The first response for a key (scoped to the caller, method and URL) is
+    kept for ``TTL`` seconds and replayed for any retry. A retry arriving
+    while the first request is still running waits for its result instead
+    of running the view a second time. Reusing a key for a different body
+    is rejected with 422. Requests without the header are untouched.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"detail": "Idempotency-Key is too long"}, status=400)
+
+        options = get_options()
+        cache = caches[options["CACHE"]]
+        scoped = f"{request_scope(request)}:{request.method}:{request.path}:{key}"
+        digest = hashlib.sha256(scoped.encode()).hexdigest()
+        fingerprint = request_fingerprint(request)
+
+        deadline = time.monotonic() + options["WAIT_TIMEOUT"]
+        waiting = False
+        while True:
+            now = timezone.now()
+            record = IdempotencyKey.objects.filter(key=digest, expires_at__gt=now).first()
+            if record is None:
+                if claim(digest, fingerprint, now, options):
+                    break
+                continue
+            if record.fingerprint != fingerprint:
+                return Response({"detail": "Idempotency-Key was already used for a different request"}, status=422)
+            if record.status_code is not None:
+                count(cache, "hits")
+                return replay(record)
+
+            # Same key already in flight: wait for its response
+            if not waiting:
+                count(cache, "waits")
+                waiting = True
+            if time.monotonic() >= deadline:
+                return Response({"detail": "A request with this Idempotency-Key is still in progress"}, status=409)
+            time.sleep(options["POLL_INTERVAL"])
+
+        count(cache, "misses")
+        stored = False
+        try:
+            response = view(request, *args, **kwargs)
+            # Server errors are worth retrying, so they are not remembered
+            if response.status_code < 500 and hasattr(response, "data"):
+                IdempotencyKey.objects.filter(key=digest).update(
+                    status_code=response.status_code,
+                    data=response.data,
+                    expires_at=timezone.now() + timedelta(seconds=options["TTL"]),
+                )
+                stored = True
+            return response
+        finally:
+            if not stored:
+                IdempotencyKey.objects.filter(key=digest, status_code__isnull=True).delete()
+
+    return wrapper
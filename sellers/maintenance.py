@@ -0,0 +1,279 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connection, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .deletion import resume_deletion_jobs
+from .models import DeviceToken, EmailOTP, IdempotencyKey, MaintenanceRun, PasswordResetOTP, RevokedToken, UploadSession
+from .utils.chunked_upload import get_chunk_store
+
+logger = logging.getLogger(__name__)
+
+# Postgres advisory lock key so only one process runs maintenance at a time
+ADVISORY_LOCK_KEY = 0x5E11E2
+SCHEDULER_DISPATCH_UID = "sellers.maintenance.start_scheduler"
+
+TASKS = {}
+
+
+def get_options():
+    return {
+        "SCHEDULER": False,
+        "INTERVAL": 10 * 60,
+        "BATCH_SIZE": 1000,
+        "BATCH_PAUSE": 0.05,
+        "OTP_GRACE": timedelta(days=1),
+        "UPLOAD_SESSION_TTL": timedelta(days=2),
+        "COMPLETED_UPLOAD_TTL": timedelta(days=30),
+        "DEVICE_TOKEN_TTL": timedelta(days=270),
+        "RUN_HISTORY_TTL": timedelta(days=14),
+        **getattr(settings, "MAINTENANCE", {}),
+    }
+
+
+def task(name):
+    """
+    Register a purge task. The function receives the options and the run's
+    start time and returns the queryset of rows to delete, plus an optional
+    callback invoked with each batch of deleted primary keys.
+    """
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+# ======================================================================
+# TASKS
+# ======================================================================
+
+@task("email_otps")
+def expired_email_otps(options, now):
+    # Kept for a grace period so a just-expired code still reads as "expired"
+    return EmailOTP.objects.filter(expires_at__lt=now - options["OTP_GRACE"]), None
+
+
+@task("password_reset_otps")
+def expired_password_reset_otps(options, now):
+    return PasswordResetOTP.objects.filter(expires_at__lt=now - options["OTP_GRACE"]), None
+
+
+@task("revoked_tokens")
+def expired_revoked_tokens(options, now):
+    # An expired token fails signature validation anyway
+    return RevokedToken.objects.filter(expires_at__lt=now), None
+
+
+@task("idempotency_keys")
+def expired_idempotency_keys(options, now):
+    return IdempotencyKey.objects.filter(expires_at__lt=now), None
+
+
+@task("upload_sessions")
+def abandoned_upload_sessions(options, now):
+    def discard_chunks(pks):
+        store = get_chunk_store()
+        for pk in pks:
+            store.discard(pk)
+
+    # Idle since the last chunk (or claim), leaving out completes still running
+    claim_timeout = timedelta(seconds=getattr(settings, "CHUNKED_UPLOAD", {}).get("CLAIM_TIMEOUT", 15 * 60))
+    queryset = UploadSession.objects.filter(
+        Q(status="open") | Q(status="assembling", updated_at__lt=now - claim_timeout),
+        updated_at__lt=now - options["UPLOAD_SESSION_TTL"],
+    )
+    return queryset, discard_chunks
+
+
+@task("completed_uploads")
+def completed_upload_sessions(options, now):
+    return UploadSession.objects.filter(status="complete", created_at__lt=now - options["COMPLETED_UPLOAD_TTL"]), None
+
+
+@task("device_tokens")
+def stale_device_tokens(options, now):
+    # FCM treats tokens unused for 270 days as expired
+    return DeviceToken.objects.filter(last_seen_at__lt=now - options["DEVICE_TOKEN_TTL"]), None
+
+
+@task("maintenance_runs")
+def old_maintenance_runs(options, now):
+    return MaintenanceRun.objects.filter(started_at__lt=now - options["RUN_HISTORY_TTL"]), None
+
+
+# ======================================================================
+# RUNNER
+# ======================================================================
+
+def purge(queryset, batch_size, pause=0.0, after_delete=None):
+    """
+    Delete ``queryset`` in primary-key order, ``batch_size`` rows at a time.
+
+    Each batch is found by seeking past the last key of the previous one, so
+    no batch rescans rows already handled, and is deleted in its own short
+    transaction so row locks are held only briefly. The original filter is
+    applied again on delete, so rows that changed in between are kept, and
+    ``after_delete`` is only given the keys that were actually deleted.
+    Returns ``(rows, batches)``.
+    """
+    label = queryset.model._meta.label
+    rows = batches = 0
+    last_pk = None
+
+    while True:
+        page = queryset.order_by("pk")
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        pks = list(page.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+
+        with transaction.atomic():
+            doomed = queryset.filter(pk__in=pks)
+            if after_delete is not None:
+                # Lock the rows that still match, so exactly these are deleted
+                doomed = list(doomed.select_for_update().values_list("pk", flat=True))
+                _, deleted = queryset.filter(pk__in=doomed).delete()
+            else:
+                _, deleted = doomed.delete()
+        rows += deleted.get(label, 0)
+        batches += 1
+        if after_delete is not None and doomed:
+            after_delete(doomed)
+
+        if len(pks) < batch_size:
+            break
+        last_pk = pks[-1]
+        if pause:
+            time.sleep(pause)
+
+    return rows, batches
+
+
+@contextmanager
+def exclusive():
+    """
+    Yield True if this process may run maintenance. On Postgres a
+    session-level advisory lock keeps concurrent runners (every worker's
+    scheduler, a cron'd command) from overlapping.
+    """
+    if connection.vendor != "postgresql":
+        yield True
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [ADVISORY_LOCK_KEY])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [ADVISORY_LOCK_KEY])
+
+
+def run_maintenance(tasks=None, dry_run=False, options=None):
+    """
+    Run the given tasks (all by default) and return one result dict per
+    task. Unless ``dry_run``, every task's outcome is logged and saved as a
+    MaintenanceRun, and a full run also resumes pending deletion jobs.
+    Returns None if another process holds the lock.
+    """
+    options = {**get_options(), **(options or {})}
+    results = []
+
+    with exclusive() as acquired:
+        if not acquired:
+            logger.info("Maintenance is already running elsewhere, skipping")
+            return None
+
+        for name in tasks or TASKS:
+            now = timezone.now()
+            queryset, after_delete = TASKS[name](options, now)
+            start = time.perf_counter()
+            if dry_run:
+                rows, batches = queryset.count(), 0
+            else:
+                rows, batches = purge(queryset, options["BATCH_SIZE"], options["BATCH_PAUSE"], after_delete)
+            duration = time.perf_counter() - start
+
+            result = {"task": name, "rows": rows, "batches": batches, "duration": duration, "started_at": now}
+            results.append(result)
+            if not dry_run:
+                logger.info("Maintenance %s: purged %d rows in %d batches (%.2fs)", name, rows, batches, duration)
+                MaintenanceRun.objects.create(**result)
+
+        if not tasks and not dry_run:
+            # Retry account deletions that failed or whose worker went away
+            resumed = resume_deletion_jobs()
+            if resumed:
+                logger.info("Maintenance resumed %d deletion jobs", resumed)
+
+    return results
+
+
+def maintenance_stats():
+    """The latest run of each task, for the admin dashboard."""
+    latest = {}
+    for name in TASKS:
+        run = MaintenanceRun.objects.filter(task=name).order_by("-started_at").first()
+        if run is not None:
+            latest[name] = {"rows": run.rows, "batches": run.batches, "duration": run.duration, "started_at": run.started_at}
+    return latest
+
+
+# ======================================================================
+# IN-PROCESS SCHEDULER
+# ======================================================================
+
+class MaintenanceScheduler:
+    """
+    Daemon thread running ``run_maintenance`` every ``INTERVAL`` seconds
+    (with jitter, so workers started together don't all wake at once).
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval * random.uniform(0.9, 1.1))
+            try:
+                run_maintenance()
+            except Exception:
+                logger.exception("Maintenance run failed")
+            finally:
+                # Don't hold a connection through the sleep
+                connections.close_all()
+
+
+_scheduler = None
+
+
+def start_scheduler(**kwargs):
+    """
+    request_started receiver connected by SellerConfig.ready(). Starting on
+    the first request rather than at import keeps management commands and
+    the gunicorn master free of the thread.
+    """
+    global _scheduler
+    request_started.disconnect(dispatch_uid=SCHEDULER_DISPATCH_UID)
+    if _scheduler is None:
+        _scheduler = MaintenanceScheduler(get_options()["INTERVAL"])
+    _scheduler.start()
@@ -0,0 +1,566 @@
+import io
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def count_queries(func):
+    # CaptureQueriesContext can't be used around test-client requests: the
+    # request_started signal resets connection.queries mid-capture.
+    from django.db import connection
+
+    executed = []
+
+    def record(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        result = func()
+    return result, len(executed)
+
+
+def timed(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return time.perf_counter() - start
+
+
+# ======================================================================
+# RENDERERS
+# ======================================================================
+
+def sample_status_payload(documents):
+    now = timezone.now()
+    return {
+        "status": "pending",
+        "admin_comment": "",
+        "profile": {
+            "id": 1042,
+            "factory_name": "Shree Ganesh Textiles",
+            "mobile": "9876543210",
+            "gstin": "24AAACS1234F1Z5",
+            "iec": "0512345678",
+            "address": "Plot 14, GIDC Estate, Surat, Gujarat",
+            "geo_lat": Decimal("21.170240"),
+            "geo_long": Decimal("72.831061"),
+            "status": "pending",
+            "admin_comment": None,
+            "documents": [
+                {
+                    "id": i,
+                    "doc_type": "gst_certificate",
+                    "file": f"https://res.cloudinary.com/demo/raw/upload/seller_docs/1042/gst_{i}.pdf",
+                    "uploaded_at": now - timedelta(days=i),
+                }
+                for i in range(documents)
+            ],
+        },
+    }
+
+
+@benchmark("renderers")
+def bench_renderers(command, options):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from sellers.renderers import FastJSONParser, FastJSONRenderer, MessagePackParser, MessagePackRenderer
+
+    iterations = options["iterations"]
+    payload = sample_status_payload(options["documents"] or 20)
+    formats = [
+        ("json (stdlib)", JSONRenderer(), JSONParser()),
+        ("json (fast)", FastJSONRenderer(), FastJSONParser()),
+        ("msgpack", MessagePackRenderer(), MessagePackParser()),
+    ]
+
+    command.stdout.write(f"{'format':<16}{'bytes':>10}{'render/s':>14}{'parse/s':>14}")
+    for label, renderer, parser in formats:
+        body = renderer.render(payload)
+        render_time = timed(lambda: renderer.render(payload), iterations)
+        parse_time = timed(lambda: parser.parse(io.BytesIO(body)), iterations)
+        command.stdout.write(
+            f"{label:<16}{len(body):>10}{iterations / render_time:>14.0f}{iterations / parse_time:>14.0f}"
+        )
+
+
+# ======================================================================
+# SPARSE FIELDSETS
+# ======================================================================
+
+class Rollback(Exception):
+    pass
+
+
+@benchmark("fields")
+def bench_fields(command, options):
+    """
+    Compare status_view payloads with and without ?fields= / ?expand=.
+    Documents live in a temporary local storage, so no Cloudinary
+    credentials are needed.
+    """
+    import tempfile
+
+    from django.contrib.auth.models import User
+    from django.core.files.storage import FileSystemStorage
+    from django.db import transaction
+    from django.test import Client
+    from sellers.models import Document, SellerProfile
+
+    iterations = max(options["iterations"] // 10, 1)
+    variants = ["", "?fields=status", "?fields=status,factory_name,geo_lat", "?fields=status&expand=documents",
+                "?fields=status,documents.doc_type"]
+
+    field = Document._meta.get_field("file")
+    original_storage = field.storage
+
+    try:
+        with tempfile.TemporaryDirectory() as root, transaction.atomic():
+            field.storage = FileSystemStorage(location=root, base_url="/media/")
+            user = User.objects.create(username="bench-fields@example.com")
+            profile = SellerProfile.objects.create(user=user, factory_name="Bench Factory")
+            Document.objects.bulk_create(
+                Document(seller=profile, doc_type=f"doc_{i % 5}", file=f"seller_docs/{profile.id}/doc_{i}.pdf")
+                for i in range(options["documents"] or 20)
+            )
+
+            client = Client()
+            url = f"/api/seller/status/{user.id}/"
+            command.stdout.write(f"{'query':<40}{'bytes':>8}{'queries':>9}{'ms/req':>9}")
+            for query in variants:
+                response, queries = count_queries(lambda: client.get(url + query))
+                elapsed = timed(lambda: client.get(url + query), iterations)
+                command.stdout.write(
+                    f"{query or '(full)':<40}{len(response.content):>8}{queries:>9}{elapsed * 1000 / iterations:>9.2f}"
+                )
+            raise Rollback
+    except Rollback:
+        pass
+    finally:
+        field.storage = original_storage
+
+
+# ======================================================================
+# SIGNUP CONCURRENCY
+# ======================================================================
+
+@benchmark("signup")
+def bench_signup(command, options):
+    """
+    Fire parallel signups at the configured database: a burst for one shared
+    email plus one per unique email, then check that exactly one account
+    (with profile and OTP) exists per email. Emails are not sent.
+    Use Postgres; SQLite serialises writers and reports lock errors.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from unittest import mock
+
+    from django.contrib.auth.models import User
+    from django.db import connections
+    from django.test import Client
+    from sellers.models import EmailOTP, SellerProfile
+
+    workers = options["workers"]
+    prefix = f"bench-signup-{int(time.time())}"
+    shared = f"{prefix}-shared@example.com"
+    emails = [shared] * workers + [f"{prefix}-{i}@example.com" for i in range(workers * 4)]
+
+    def attempt(email):
+        try:
+            response = Client().post("/api/auth/signup/", {
+                "email": email, "mobile": "9876543210", "password": "bench-password",
+            }, content_type="application/json")
+            return response.status_code
+        except Exception as exc:
+            return type(exc).__name__
+        finally:
+            connections.close_all()
+
+    with mock.patch("sellers.views.send_email_otp"):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(attempt, emails))
+        elapsed = time.perf_counter() - start
+
+    outcomes = {}
+    for result in results:
+        outcomes[result] = outcomes.get(result, 0) + 1
+
+    users = User.objects.filter(username__startswith=prefix)
+    unique_emails = set(emails)
+    problems = []
+    if users.count() != len(unique_emails):
+        problems.append(f"expected {len(unique_emails)} users, found {users.count()}")
+    if SellerProfile.objects.filter(user__in=users).count() != users.count():
+        problems.append("users without a seller profile")
+    if EmailOTP.objects.filter(email__startswith=prefix).values("email").distinct().count() != users.count():
+        problems.append("users without an OTP")
+
+    command.stdout.write(f"{len(emails)} signups in {elapsed:.2f}s ({len(emails) / elapsed:.1f}/s)")
+    command.stdout.write(f"outcomes: {outcomes}")
+    command.stdout.write("consistency: " + ("; ".join(problems) if problems else "ok"))
+
+    EmailOTP.objects.filter(email__startswith=prefix).delete()
+    users.delete()
+
+
+# ======================================================================
+# MIDDLEWARE STACKS
+# ======================================================================
+
+FULL_STACK_EQUIVALENTS = {
+    "backend.middleware.SessionMiddleware": "django.contrib.sessions.middleware.SessionMiddleware",
+    "backend.middleware.CsrfViewMiddleware": "django.middleware.csrf.CsrfViewMiddleware",
+    "backend.middleware.AuthenticationMiddleware": "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "backend.middleware.MessageMiddleware": "django.contrib.messages.middleware.MessageMiddleware",
+}
+
+
+@benchmark("middleware")
+def bench_middleware(command, options):
+    """
+    Per-request overhead of the configured (path-scoped) middleware stack
+    versus the stock Django stack, measured through the real request handler
+    against an unrouted /api/ URL so the view itself costs the same in both.
+    """
+    from django.conf import settings
+    from django.core.handlers.base import BaseHandler
+    from django.test import RequestFactory, override_settings
+
+    lean = list(settings.MIDDLEWARE)
+    full = [FULL_STACK_EQUIVALENTS.get(path, path) for path in lean]
+    factory = RequestFactory(SERVER_NAME="localhost")
+    iterations = options["iterations"]
+
+    command.stdout.write(f"{'stack':<8}{'path':<24}{'us/req':>10}")
+    for label, stack in (("full", full), ("lean", lean)):
+        with override_settings(MIDDLEWARE=stack, DEBUG=False):
+            handler = BaseHandler()
+            handler.load_middleware()
+            for path in ("/api/__bench__/", "/admin/__bench__/"):
+                elapsed = timed(lambda: handler.get_response(factory.get(path)), iterations)
+                command.stdout.write(f"{label:<8}{path:<24}{elapsed * 1e6 / iterations:>10.1f}")
+
+
+# ======================================================================
+# PUSH NOTIFICATIONS
+# ======================================================================
+
+@benchmark("push")
+def bench_push(command, options):
+    """
+    Simulate an admin bulk-approve through NotificationDispatcher with the
+    fake transport: every seller changes status twice (coalesced to one
+    push) and a tenth of the device tokens are stale.
+    """
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from sellers.models import DeviceToken
+    from sellers.notifications import FakeTransport, NotificationDispatcher
+
+    sellers = options["sellers"] or 5000
+    latency = options["latency"]
+
+    try:
+        with transaction.atomic():
+            users = User.objects.bulk_create(User(username=f"bench-push-{i}@example.com") for i in range(sellers))
+            tokens = [
+                DeviceToken(user=user, token=f"bench-token-{user.pk}-{n}", platform="android")
+                for user in users for n in range(2)
+            ]
+            DeviceToken.objects.bulk_create(tokens)
+
+            stale = {t.token for i, t in enumerate(tokens) if i % 10 == 0}
+            transport = FakeTransport(invalid_tokens=stale, latency=latency)
+            # Flushed by hand: a background thread couldn't see these uncommitted rows
+            dispatcher = NotificationDispatcher(transport, background=False)
+
+            for user in users:
+                dispatcher.enqueue(user.pk, "pending")
+                dispatcher.enqueue(user.pk, "approved", "Welcome aboard")
+
+            start = time.perf_counter()
+            dispatcher.flush()
+            elapsed = time.perf_counter() - start
+
+            remaining = DeviceToken.objects.filter(user__in=users).count()
+            command.stdout.write(f"events enqueued:     {dispatcher.stats['events']}")
+            command.stdout.write(f"devices notified:    {dispatcher.stats['sent']} ({dispatcher.stats['invalid']} invalid)")
+            command.stdout.write(f"multicast calls:     {dispatcher.stats['calls']}")
+            command.stdout.write(f"flush time:          {elapsed:.3f}s at {latency * 1000:.0f}ms per call")
+            command.stdout.write(f"serial one-per-event: ~{dispatcher.stats['events'] * 2 * latency:.1f}s")
+            command.stdout.write(f"tokens pruned:       {len(tokens) - remaining}")
+            raise Rollback
+    except Rollback:
+        pass
+
+
+# ======================================================================
+# REQUEST PROFILING
+# ======================================================================
+
+@benchmark("profiling")
+def bench_profiling(command, options):
+    """
+    Per-request cost of ProfilingMiddleware: disabled (removed from the
+    stack), enabled but not triggered, watching for slow requests with the
+    stack sampler, and a full cProfile capture saved to a temporary store.
+    """
+    import tempfile
+
+    from django.core.handlers.base import BaseHandler
+    from django.test import RequestFactory, override_settings
+    from sellers.profiling import HEADER, make_profile_token
+
+    factory = RequestFactory(SERVER_NAME="localhost")
+    iterations = options["iterations"]
+    token = make_profile_token(type("Admin", (), {"pk": 0})())
+    header = {"HTTP_" + HEADER.upper().replace("-", "_"): token}
+
+    with tempfile.TemporaryDirectory() as root:
+        base = {"ROOT": root, "MAX_PROFILES": 50}
+        cases = [
+            ("disabled", {"ENABLED": False}, {}),
+            ("enabled, idle", {"ENABLED": True}, {}),
+            ("slow watch", {"ENABLED": True, "SLOW_MS": 10_000}, {}),
+            ("header", {"ENABLED": True}, header),
+        ]
+        command.stdout.write(f"{'mode':<16}{'us/req':>10}")
+        for label, profiling, extra in cases:
+            with override_settings(PROFILING={**base, **profiling}, DEBUG=False):
+                handler = BaseHandler()
+                handler.load_middleware()
+                request = lambda: handler.get_response(factory.get("/api/__bench__/", **extra))
+                timed(request, 50)  # warm up
+                elapsed = timed(request, iterations)
+                command.stdout.write(f"{label:<16}{elapsed * 1e6 / iterations:>10.1f}")
+
+
+# ======================================================================
+# TOKEN REVOCATION
+# ======================================================================
+
+@benchmark("revocation")
+def bench_revocation(command, options):
+    """
+    Cost of checking revocation on every authenticated request: plain
+    JWTAuthentication, a per-request database lookup (what a DB-backed
+    denylist costs) and RevocableJWTAuthentication's Bloom filter, for a
+    user never revoked and one revoked before the token was issued.
+    """
+    import random
+
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from django.test import RequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.settings import api_settings
+    from sellers.authentication import RevocableJWTAuthentication
+    from sellers.models import TokenVersion
+    from sellers.revocation import BloomFilter, get_options, issue_tokens, revoke_user
+
+    settings = get_options()
+    bloom = BloomFilter(settings["CAPACITY"], settings["ERROR_RATE"])
+    for i in range(settings["CAPACITY"]):
+        bloom.add(str(i))
+    probes = [str(random.randrange(10**9, 10**10)) for _ in range(100_000)]
+    start = time.perf_counter()
+    false_positives = sum(key in bloom for key in probes)
+    per_check = (time.perf_counter() - start) / len(probes)
+    command.stdout.write(
+        f"bloom: {settings['CAPACITY']} keys in {len(bloom.bits) / 1024:.0f} KiB, {bloom.hashes} hashes, "
+        f"{false_positives / len(probes):.4%} false positives, {per_check * 1e6:.2f} us/check"
+    )
+
+    class DatabaseCheckAuthentication(JWTAuthentication):
+        def get_validated_token(self, raw_token):
+            token = super().get_validated_token(raw_token)
+            TokenVersion.objects.filter(user_id=token[api_settings.USER_ID_CLAIM]).values_list("version", flat=True).first()
+            return token
+
+    factory = RequestFactory()
+    iterations = options["iterations"]
+    try:
+        with transaction.atomic():
+            fresh = User.objects.create(username="bench-revocation-fresh@example.com")
+            revoked = User.objects.create(username="bench-revocation-revoked@example.com")
+            revoke_user(revoked.pk)
+            cases = [
+                ("jwt only", JWTAuthentication(), fresh),
+                ("db lookup", DatabaseCheckAuthentication(), fresh),
+                ("bloom, clean", RevocableJWTAuthentication(), fresh),
+                ("bloom, revoked", RevocableJWTAuthentication(), revoked),
+            ]
+
+            command.stdout.write(f"{'check':<16}{'us/req':>10}{'queries/req':>14}")
+            for label, authentication, user in cases:
+                access = str(issue_tokens(user).access_token)
+                request = factory.get("/api/user/me/", HTTP_AUTHORIZATION=f"Bearer {access}")
+                authentication.authenticate(request)  # warm up: builds the filter once
+                elapsed = timed(lambda: authentication.authenticate(request), iterations)
+                _, queries = count_queries(lambda: [authentication.authenticate(request) for _ in range(100)])
+                command.stdout.write(f"{label:<16}{elapsed * 1e6 / iterations:>10.1f}{queries / 100:>14.2f}")
+            raise Rollback
+    except Rollback:
+        pass
+
+
+# ======================================================================
+# ACCOUNT DELETION
+# ======================================================================
+
+@benchmark("deletion")
+def bench_deletion(command, options):
+    """
+    Delete sellers with hundreds of documents each against local stand-ins
+    for Cloudinary that add --latency per call and fail every 20th file once:
+    the old synchronous path (user.delete() plus one storage call per file)
+    against the new soft delete and background job, with per-file and bulk
+    storage deletes.
+    """
+    import os
+    import tempfile
+
+    from django.contrib.auth.models import User
+    from django.core.files.storage import FileSystemStorage
+    from django.db import transaction
+    from django.test import Client
+    from sellers.deletion import get_options, run_deletion_job
+    from sellers.models import Document, SellerProfile
+    from sellers.views import get_tokens_for_user
+
+    sellers = options["sellers"] or 3
+    documents = options["documents"] or 300
+    latency = options["latency"]
+
+    class LocalStorage(FileSystemStorage):
+        """One simulated round trip per call; the first delete of every 20th file fails."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.calls = 0
+            self.failed_once = set()
+
+        def flaky(self, name):
+            number = int(name.rsplit("_", 1)[1].split(".")[0])
+            if number % 20 == 0 and name not in self.failed_once:
+                self.failed_once.add(name)
+                return True
+            return False
+
+        def delete(self, name):
+            self.calls += 1
+            time.sleep(latency)
+            if self.flaky(name):
+                raise OSError(f"simulated failure deleting {name}")
+            super().delete(name)
+
+    class BulkLocalStorage(LocalStorage):
+        def delete_many(self, names):
+            self.calls += 1
+            time.sleep(latency)
+            failed = [name for name in names if self.flaky(name)]
+            for name in names:
+                if name not in failed:
+                    FileSystemStorage.delete(self, name)
+            return failed
+
+    def create_sellers(storage, label):
+        users = []
+        for i in range(sellers):
+            user = User.objects.create(username=f"bench-delete-{label}-{i}@example.com")
+            profile = SellerProfile.objects.create(user=user, factory_name="Bench Factory", status="approved")
+            names = [f"seller_docs/{profile.pk}/doc_{n}.pdf" for n in range(documents)]
+            for name in names:
+                os.makedirs(os.path.dirname(storage.path(name)), exist_ok=True)
+                with open(storage.path(name), "wb") as fh:
+                    fh.write(b"%PDF-1.4 bench")
+            Document.objects.bulk_create(Document(seller=profile, doc_type="doc", file=name) for name in names)
+            users.append(user)
+        return users
+
+    def files_left(root):
+        return sum(len(files) for _dir, _subdirs, files in os.walk(root))
+
+    field = Document._meta.get_field("file")
+    original_storage = field.storage
+    job_options = {"RETRY_BACKOFF": latency}
+    concurrency = get_options()["STORAGE_CONCURRENCY"]
+    command.stdout.write(
+        f"{sellers} sellers x {documents} documents, {latency * 1000:.0f}ms per storage call, "
+        f"{concurrency} concurrent calls"
+    )
+    command.stdout.write(f"{'path':<26}{'request ms':>12}{'total s':>10}{'calls':>8}{'files left':>12}")
+
+    try:
+        with transaction.atomic():
+            admin = User.objects.create(username="bench-delete-admin@example.com", is_staff=True)
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(admin)['access']}")
+
+            for label, storage_class in (("sync (before)", LocalStorage), ("job, per-file", LocalStorage),
+                                         ("job, bulk", BulkLocalStorage)):
+                with tempfile.TemporaryDirectory() as root:
+                    storage = storage_class(location=root)
+                    field.storage = storage
+                    users = create_sellers(storage, label.split()[1])
+
+                    start = time.perf_counter()
+                    if label.startswith("sync"):
+                        for user in users:
+                            for document in Document.objects.filter(seller__user=user):
+                                try:
+                                    storage.delete(document.file.name)
+                                except OSError:
+                                    pass
+                            user.delete()
+                        request_time = time.perf_counter() - start
+                    else:
+                        request_time = 0.0
+                        jobs = []
+                        for user in users:
+                            request_start = time.perf_counter()
+                            response = client.delete(f"/api/auth/delete-user/{user.pk}/")
+                            request_time += time.perf_counter() - request_start
+                            jobs.append(response.json()["jobId"])
+                        # on_commit never fires inside this transaction, so run the jobs here
+                        for job_id in jobs:
+                            job = run_deletion_job(job_id, job_options)
+                            assert job.status == "done" and job.files_failed == 0, job.error
+                    total = time.perf_counter() - start
+
+                    command.stdout.write(
+                        f"{label:<26}{request_time * 1000 / sellers:>12.1f}{total:>10.2f}"
+                        f"{storage.calls:>8}{files_left(root):>12}"
+                    )
+            raise Rollback
+    except Rollback:
+        pass
+    finally:
+        field.storage = original_storage
+
+
+class Command(BaseCommand):
+    help = "Run a micro-benchmark, e.g. `manage.py bench renderers`."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=sorted(BENCHMARKS))
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--documents", type=int, help="Documents per seller (default depends on the benchmark)")
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--sellers", type=int, help="Sellers to create (default depends on the benchmark)")
+        parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per transport call")
+
+    def handle(self, *args, **options):
+        BENCHMARKS[options["name"]](self, options)
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sellers.maintenance import TASKS, get_options, run_maintenance
+
+
+class Command(BaseCommand):
+    help = "Delete expired OTPs, revoked tokens and other stale rows in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--task", action="append", choices=sorted(TASKS), dest="tasks",
+                            help="Run only this task (repeatable); default is all")
+        parser.add_argument("--batch-size", type=int, help="Rows deleted per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be deleted")
+        parser.add_argument("--loop", action="store_true", help="Keep running every MAINTENANCE['INTERVAL'] seconds")
+
+    def handle(self, *args, **options):
+        overrides = {"BATCH_SIZE": options["batch_size"]} if options["batch_size"] else {}
+
+        while True:
+            results = run_maintenance(options["tasks"], dry_run=options["dry_run"], options=overrides)
+            if results is None:
+                self.stdout.write("Maintenance is already running in another process.")
+            else:
+                self.report(results, options["dry_run"])
+
+            if not options["loop"]:
+                break
+            time.sleep(get_options()["INTERVAL"])
+
+    def report(self, results, dry_run):
+        verb = "would purge" if dry_run else "purged"
+        for result in results:
+            self.stdout.write(
+                f"  {result['task']:<22}{verb} {result['rows']:>9} rows"
+                f" in {result['batches']:>5} batches ({result['duration']:.2f}s)"
+            )
+        rows = sum(r["rows"] for r in results)
+        seconds = sum(r["duration"] for r in results)
+        summary = f"{rows} rows to purge" if dry_run else f"{rows} rows purged in {seconds:.2f}s"
+        self.stdout.write(self.style.SUCCESS(summary))
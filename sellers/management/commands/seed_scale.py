@@ -0,0 +1,226 @@
+import multiprocessing
+import os
+import random
+import time
+from argparse import ArgumentTypeError
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from sellers.models import Document, EmailOTP, PasswordResetOTP, SellerProfile, StatusCounter
+
+STATUS_WEIGHTS = [("new", 25), ("pending", 30), ("approved", 35), ("rejected", 10)]
+
+# (documents min, max) uploaded by a seller in each status
+DOCUMENTS_BY_STATUS = {"new": (0, 0), "pending": (2, 5), "approved": (4, 7), "rejected": (1, 6)}
+
+DOC_TYPES = ["gst_certificate", "iec_certificate", "factory_license", "pan_card", "cancelled_cheque", "factory_photo"]
+
+# Textile / manufacturing clusters the sellers are scattered around
+CLUSTERS = [
+    ("Surat", 21.1702, 72.8311),
+    ("Tiruppur", 11.1085, 77.3411),
+    ("Ludhiana", 30.9010, 75.8573),
+    ("Moradabad", 28.8386, 78.7733),
+    ("Jaipur", 26.9124, 75.7873),
+    ("Panipat", 29.3909, 76.9635),
+    ("Kanpur", 26.4499, 80.3319),
+]
+
+
+@contextmanager
+def historical_timestamps():
+    """Let bulk_create keep the generated created/uploaded times instead of now()."""
+    fields = [
+        Document._meta.get_field("uploaded_at"),
+        EmailOTP._meta.get_field("created_at"),
+        PasswordResetOTP._meta.get_field("created_at"),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def build_chunk(options, chunk_index, start, stop):
+    """Generate and insert sellers ``start..stop``; returns rows inserted per model."""
+    rng = random.Random(f"{options['seed']}:{chunk_index}")
+    now = options["now"]
+    prefix = options["prefix"]
+    statuses, weights = zip(*STATUS_WEIGHTS)
+
+    profile_plans = []
+    for i in range(start, stop):
+        status = rng.choices(statuses, weights)[0]
+        city, lat, lng = rng.choice(CLUSTERS)
+        user = User(
+            username=f"{prefix}-{i:08d}@seed.example.com",
+            email=f"{prefix}-{i:08d}@seed.example.com",
+            password=options["password_hash"],
+            first_name=f"Owner {i}",
+            date_joined=now - timedelta(days=rng.randint(0, 720)),
+            is_active=status != "new",
+        )
+        profile_plans.append((user, status, city, lat + rng.gauss(0, 0.15), lng + rng.gauss(0, 0.15)))
+    users = [plan[0] for plan in profile_plans]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=options["batch_size"])
+
+        profiles = [
+            SellerProfile(
+                user_id=user.pk,
+                factory_name=f"{city} Manufacturing {user.pk}",
+                mobile=f"9{rng.randint(100000000, 999999999)}",
+                gstin=f"{rng.randint(10, 37)}AAAC{rng.randint(10000, 99999)}A1Z{rng.randint(1, 9)}",
+                iec=str(rng.randint(1000000000, 9999999999)),
+                address=f"Plot {rng.randint(1, 400)}, Industrial Area, {city}",
+                geo_lat=Decimal(f"{lat:.6f}"),
+                geo_long=Decimal(f"{lng:.6f}"),
+                status=status,
+                admin_comment="Documents unclear, please re-upload" if status == "rejected" else None,
+                status_changed_at=min(user.date_joined + timedelta(days=rng.randint(0, 30)), now),
+            )
+            for user, status, city, lat, lng in profile_plans
+        ]
+        SellerProfile.objects.bulk_create(profiles, batch_size=options["batch_size"])
+
+        documents, email_otps, reset_otps = [], [], []
+        for profile, (user, status, *_rest) in zip(profiles, profile_plans):
+            low, high = DOCUMENTS_BY_STATUS[status]
+            for n in range(rng.randint(low, high)):
+                doc_type = DOC_TYPES[n % len(DOC_TYPES)]
+                documents.append(Document(
+                    seller_id=profile.pk,
+                    doc_type=doc_type,
+                    file=f"seller_docs/{profile.pk}/{doc_type}_{n}.pdf",
+                    uploaded_at=min(user.date_joined + timedelta(hours=rng.randint(1, 24 * 30)), now),
+                ))
+
+            # Unverified sellers have a recent OTP, some still active; everyone
+            # else left a trail of long-expired ones behind.
+            otp_times = [
+                min(user.date_joined + timedelta(minutes=rng.randint(0, 60)), now) for _ in range(rng.randint(1, 3))
+            ]
+            if status == "new" and rng.random() < 0.4:
+                otp_times.append(now - timedelta(minutes=rng.randint(0, 9)))
+            for created in otp_times:
+                email_otps.append(EmailOTP(
+                    email=user.email, otp=f"{rng.randint(100000, 999999)}",
+                    created_at=created, expires_at=created + timedelta(minutes=10),
+                ))
+
+            if rng.random() < 0.05:
+                created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+                reset_otps.append(PasswordResetOTP(
+                    email=user.email, otp=f"{rng.randint(100000, 999999)}",
+                    created_at=created, expires_at=created + timedelta(minutes=10),
+                ))
+
+        with historical_timestamps():
+            Document.objects.bulk_create(documents, batch_size=options["batch_size"])
+            EmailOTP.objects.bulk_create(email_otps, batch_size=options["batch_size"])
+            PasswordResetOTP.objects.bulk_create(reset_otps, batch_size=options["batch_size"])
+
+    return {
+        "users": len(users),
+        "profiles": len(profiles),
+        "documents": len(documents),
+        "email_otps": len(email_otps),
+        "reset_otps": len(reset_otps),
+    }
+
+
+def run_chunk(args):
+    # Runs in a forked worker: never reuse the parent's database connections
+    connections.close_all()
+    try:
+        return build_chunk(*args)
+    finally:
+        connections.close_all()
+
+
+def parse_now(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ArgumentTypeError(f"not an ISO 8601 datetime: {value!r}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = "Generate large volumes of realistic, correlated seller data for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sellers", type=int, default=100_000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--chunk-size", type=int, default=5_000, help="Sellers generated per worker task")
+        parser.add_argument("--batch-size", type=int, default=2_000, help="Rows per INSERT statement")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Worker processes (default: CPU count on Postgres, 1 elsewhere)")
+        parser.add_argument("--prefix", default="seed", help="Username prefix; change it to seed the same DB twice")
+        parser.add_argument("--password", default="seed-password")
+        parser.add_argument("--now", type=parse_now, default=None,
+                            help="Reference time (ISO 8601) the data is generated around; fix it, together "
+                                 "with --seed, to get identical output on every run (default: current time)")
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if workers is None:
+            workers = os.cpu_count() if connection.vendor == "postgresql" else 1
+
+        shared = {
+            "seed": options["seed"],
+            "prefix": options["prefix"],
+            "batch_size": options["batch_size"],
+            # Hash once: every seeded account shares the same password. The
+            # salt comes from the seed so reruns produce the same hash.
+            "password_hash": make_password(options["password"], salt=f"seed{options['seed']}"),
+            "now": options["now"] or timezone.now(),
+        }
+        chunk = options["chunk_size"]
+        tasks = [
+            (shared, index, start, min(start + chunk, options["sellers"]))
+            for index, start in enumerate(range(0, options["sellers"], chunk))
+        ]
+
+        self.stdout.write(f"Seeding {options['sellers']} sellers in {len(tasks)} chunks with {workers} worker(s)...")
+        totals = {}
+        started = time.perf_counter()
+
+        if workers > 1:
+            connections.close_all()
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                results = pool.imap_unordered(run_chunk, tasks)
+                for done, counts in enumerate(results, 1):
+                    self.accumulate(totals, counts, done, len(tasks), started)
+        else:
+            for done, task in enumerate(tasks, 1):
+                self.accumulate(totals, build_chunk(*task), done, len(tasks), started)
+
+        # bulk_create bypasses the signals that maintain the dashboard counters
+        StatusCounter.rebuild()
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        for model, count in totals.items():
+            self.stdout.write(f"  {model:<12}{count:>12}")
+        self.stdout.write(self.style.SUCCESS(f"{rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec)"))
+
+    def accumulate(self, totals, counts, done, total_chunks, started):
+        for model, count in counts.items():
+            totals[model] = totals.get(model, 0) + count
+        rows = sum(totals.values())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  chunk {done}/{total_chunks}: {rows} rows, {rows / elapsed:,.0f} rows/sec")
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:40
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0008_alter_document_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('doc_type', models.CharField(max_length=128)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('complete', 'Complete')], default='open', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='sellers.document')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='sellers.sellerprofile')),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_status_counters(apps, schema_editor):
+    SellerProfile = apps.get_model("sellers", "SellerProfile")
+    StatusCounter = apps.get_model("sellers", "StatusCounter")
+    current = SellerProfile.objects.values_list("status").annotate(total=models.Count("id"))
+    StatusCounter.objects.bulk_create(
+        StatusCounter(status=status, count=total, entered=total) for status, total in current
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0009_uploadsession'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusCounter',
+            fields=[
+                ('status', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('count', models.BigIntegerField(default=0)),
+                ('entered', models.BigIntegerField(default=0)),
+                ('wait_samples', models.BigIntegerField(default=0)),
+                ('total_wait_seconds', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=32, null=True)),
+                ('to_status', models.CharField(max_length=32)),
+                ('admin_comment', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='sellers.sellerprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seller', '-created_at'], name='sellers_sta_seller__14a88f_idx')],
+            },
+        ),
+        migrations.RunPython(seed_status_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0012_token_revocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=64)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('batches', models.PositiveIntegerField(default=0)),
+                ('duration', models.FloatField(help_text='Seconds')),
+                ('started_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', '-started_at'], name='sellers_mai_task_8cf7b6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:15
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0015_alter_uploadsession_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('key', models.CharField(help_text='SHA-256 of scope, method, path and key', max_length=64, primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(help_text='SHA-256 of method, path and body', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, help_text='Empty while in flight', null=True)),
+                ('data', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
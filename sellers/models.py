@@ -1,7 +1,10 @@
-from django.db import models
+import uuid
+from django.db import models, transaction
+from django.db.models import Count, F
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from cloudinary_storage.storage import MediaCloudinaryStorage
 
 # 💡 Added "new" as the default status for newly registered sellers
@@ -24,10 +27,71 @@ class SellerProfile(models.Model):
     geo_long = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     status = models.CharField(max_length=32, choices=VERIFICATION_CHOICES, default="new")  
     admin_comment = models.TextField(blank=True, null=True)
+    status_changed_at = models.DateTimeField(null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        # Status history and counters are written by signals; keep them in
+        # the same transaction as the row itself.
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.factory_name} ({self.user.username})"
 
+
+class StatusTransition(models.Model):
+    """Append-only log of every SellerProfile status change."""
+    seller = models.ForeignKey(SellerProfile, on_delete=models.CASCADE, related_name="status_history")
+    from_status = models.CharField(max_length=32, blank=True, null=True)
+    to_status = models.CharField(max_length=32)
+    admin_comment = models.TextField(blank=True, null=True)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["seller", "-created_at"])]
+
+    def __str__(self):
+        return f"{self.seller_id}: {self.from_status} -> {self.to_status}"
+
+
+class StatusCounter(models.Model):
+    """
+    Incrementally maintained per-status aggregates for the admin dashboard.
+
+    ``count`` is the number of sellers currently in the status, ``entered`` the
+    lifetime number of transitions into it, and the wait fields sum up how
+    long sellers sat in "pending" before moving here.
+    """
+    status = models.CharField(max_length=32, primary_key=True)
+    count = models.BigIntegerField(default=0)
+    entered = models.BigIntegerField(default=0)
+    wait_samples = models.BigIntegerField(default=0)
+    total_wait_seconds = models.FloatField(default=0)
+
+    @classmethod
+    def bump(cls, status, count=0, entered=0, wait_seconds=None):
+        changes = {"count": F("count") + count, "entered": F("entered") + entered}
+        if wait_seconds is not None:
+            changes["wait_samples"] = F("wait_samples") + 1
+            changes["total_wait_seconds"] = F("total_wait_seconds") + wait_seconds
+
+        if not cls.objects.filter(status=status).update(**changes):
+            cls.objects.get_or_create(status=status)
+            cls.objects.filter(status=status).update(**changes)
+
+    @classmethod
+    def rebuild(cls):
+        """Recount ``count`` from scratch, e.g. after bulk inserts that bypass signals."""
+        current = dict(SellerProfile.objects.values_list("status").annotate(total=Count("id")))
+        with transaction.atomic():
+            cls.objects.exclude(status__in=current).update(count=0)
+            for status, total in current.items():
+                cls.objects.update_or_create(status=status, defaults={"count": total})
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
 def seller_doc_path(instance, filename):
     label = instance.doc_type.lower().replace(" ", "_")
     return f"seller_docs/{instance.seller.id}/{label}_{filename}"
@@ -43,6 +107,64 @@ class Document(models.Model):
         return f"{self.seller.factory_name} - {self.doc_type}"
 
 
+class DeviceToken(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="device_tokens")
+    token = models.CharField(max_length=255, unique=True)
+    platform = models.CharField(max_length=16, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} ({self.platform or 'unknown'})"
+
+
+class TokenVersion(models.Model):
+    """
+    Per-user JWT generation. Tokens carry the version they were issued at and
+    are rejected once it is bumped (logout-all, password reset, rejection).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="token_version")
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.user.username} v{self.version}"
+
+
+class RevokedToken(models.Model):
+    """A single revoked token, e.g. a refresh token that has been rotated."""
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="revoked_tokens")
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.jti}"
+
+
+UPLOAD_SESSION_CHOICES = [
+    ("open", "Open"),
+    ("assembling", "Assembling"),
+    ("complete", "Complete"),
+]
+
+
+class UploadSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    seller = models.ForeignKey(SellerProfile, on_delete=models.CASCADE, related_name="upload_sessions")
+    doc_type = models.CharField(max_length=128)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=16, choices=UPLOAD_SESSION_CHOICES, default="open")
+    document = models.ForeignKey(Document, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last chunk received, or when the current complete claimed the session
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.seller.factory_name} - {self.filename} ({self.status})"
+
+
 class EmailOTP(models.Model):
     email = models.EmailField()
     otp = models.CharField(max_length=6)
@@ -77,3 +199,69 @@ class PasswordResetOTP(models.Model):
 
     def __str__(self):
         return f"{self.email} - {self.otp}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The response stored for an Idempotency-Key (see sellers.idempotency), or
+    a claim on it while the first request is still running.
+    """
+    key = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of scope, method, path and key")
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of method, path and body")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Empty while in flight")
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.status_code or 'in flight'})"
+
+
+class MaintenanceRun(models.Model):
+    """Rows purged by one maintenance task in one run (see sellers.maintenance)."""
+    task = models.CharField(max_length=64)
+    rows = models.PositiveIntegerField(default=0)
+    batches = models.PositiveIntegerField(default=0)
+    duration = models.FloatField(help_text="Seconds")
+    started_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["task", "-started_at"])]
+
+    def __str__(self):
+        return f"{self.task}: {self.rows} rows"
+
+
+DELETION_STATUS_CHOICES = [
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("done", "Done"),
+    ("failed", "Failed"),
+]
+
+
+class DeletionJob(models.Model):
+    """
+    Progress of deleting a user's account, documents and stored files in the
+    background (see sellers.deletion). Outlives the user, so it only keeps
+    the id and username.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.IntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=16, choices=DELETION_STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    documents_total = models.PositiveIntegerField(default=0)
+    documents_deleted = models.PositiveIntegerField(default=0)
+    files_deleted = models.PositiveIntegerField(default=0)
+    files_failed = models.PositiveIntegerField(default=0)
+    failed_files = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.username} ({self.status})"
@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from .models import DeviceToken
+from .profiling import span
+
+logger = logging.getLogger(__name__)
+
+# Result of sending to a single token
+SENT, INVALID, FAILED = "sent", "invalid", "failed"
+
+# FCM rejects payloads over 4KB; admin comments are unbounded
+MAX_BODY_LENGTH = 240
+
+STATUS_MESSAGES = {
+    "pending": ("Documents received", "Your documents are under review."),
+    "approved": ("Application approved", "Your seller account has been approved."),
+    "rejected": ("Application rejected", "Your application needs changes."),
+}
+
+
+class FirebaseTransport:
+    """Sends through Firebase Cloud Messaging, up to 500 tokens per call."""
+
+    max_batch = 500
+
+    def send_multicast(self, tokens, title, body, data):
+        from firebase_admin import messaging
+        from . import firebase_utils  # noqa: F401  (initialises the default app)
+
+        message = messaging.MulticastMessage(
+            tokens=tokens,
+            notification=messaging.Notification(title=title, body=body),
+            data=data,
+        )
+        with span("fcm.send_multicast", tokens=len(tokens)):
+            response = messaging.send_each_for_multicast(message)
+
+        return [SENT if result.success else send_error(result.exception) for result in response.responses]
+
+
+def send_error(exception):
+    """
+    INVALID if FCM says the token itself is dead, FAILED otherwise. FCM also
+    answers INVALID_ARGUMENT for a malformed message, which says nothing
+    about the token, so that only counts when it names the registration token.
+    """
+    from firebase_admin import exceptions, messaging
+
+    if isinstance(exception, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+        return INVALID
+    if isinstance(exception, exceptions.InvalidArgumentError) and "registration token" in str(exception).lower():
+        return INVALID
+    return FAILED
+
+
+class FakeTransport:
+    """
+    In-memory stand-in for FCM: records every call, reports tokens listed in
+    ``invalid_tokens`` as unregistered and can simulate per-call latency.
+    """
+
+    max_batch = 500
+
+    def __init__(self, invalid_tokens=(), latency=0.0):
+        self.invalid_tokens = set(invalid_tokens)
+        self.latency = latency
+        self.calls = []
+
+    def send_multicast(self, tokens, title, body, data):
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls.append({"tokens": list(tokens), "title": title, "body": body, "data": data})
+        return [INVALID if token in self.invalid_tokens else SENT for token in tokens]
+
+
+class NotificationDispatcher:
+    """
+    Collects status-change events and sends them in the background.
+
+    Events are coalesced per user (only the newest status is pushed), users
+    that end up with the same message share multicast calls, and tokens
+    reported as invalid are deleted. A bulk approval of thousands of sellers
+    therefore costs ceil(devices / 500) calls instead of one per device. If
+    the transport raises, the events of every unsent batch are queued again
+    and held back for ``retry_backoff`` seconds, doubling with each attempt;
+    an event is dropped after ``max_attempts`` failed sends.
+    """
+
+    def __init__(self, transport, batch_size=500, flush_interval=1.0, background=True,
+                 max_attempts=5, retry_backoff=2.0):
+        self.transport = transport
+        self.background = background
+        self.batch_size = min(batch_size, transport.max_batch)
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.stats = defaultdict(int)
+        self._pending = {}
+        # user_id -> (failed attempts, monotonic time the event may be retried)
+        self._retries = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def enqueue(self, user_id, status, admin_comment=None):
+        with self._lock:
+            self._pending[user_id] = (status, admin_comment or "")
+            self._retries.pop(user_id, None)  # a new event starts with a clean slate
+            self.stats["events"] += 1
+            backlog = len(self._pending)
+            if self.background and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="push-dispatcher", daemon=True)
+                self._thread.start()
+        if backlog >= self.batch_size:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Push notification flush failed")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        now = time.monotonic()
+        with self._lock:
+            events = {
+                user_id: event for user_id, event in self._pending.items()
+                if self._retries.get(user_id, (0, now))[1] <= now
+            }
+            attempts = {user_id: self._retries.pop(user_id, (0, now))[0] for user_id in events}
+            for user_id in events:
+                del self._pending[user_id]
+        if not events:
+            return
+
+        groups = defaultdict(list)
+        user_ids = list(events)
+        for start in range(0, len(user_ids), 1000):
+            rows = DeviceToken.objects.filter(user_id__in=user_ids[start:start + 1000]).values_list("user_id", "token")
+            for user_id, token in rows:
+                groups[events[user_id]].append((user_id, token))
+
+        batches = []
+        for (status, admin_comment), recipients in groups.items():
+            message = status_message(status, admin_comment)
+            for start in range(0, len(recipients), self.batch_size):
+                batches.append((message, recipients[start:start + self.batch_size]))
+
+        invalid = []
+        try:
+            for index, ((title, body, data), recipients) in enumerate(batches):
+                try:
+                    results = self.transport.send_multicast([token for _, token in recipients], title, body, data)
+                except Exception:
+                    self.requeue(events, attempts, batches[index:])
+                    raise
+                self.stats["calls"] += 1
+                for (_, token), result in zip(recipients, results):
+                    self.stats[result] += 1
+                    if result == INVALID:
+                        invalid.append(token)
+        finally:
+            if invalid:
+                DeviceToken.objects.filter(token__in=invalid).delete()
+
+    def requeue(self, events, attempts, batches):
+        """
+        Put back the events of unsent batches with a backoff, unless a newer
+        one arrived meanwhile or they have used up their attempts.
+        """
+        user_ids = {user_id for _message, recipients in batches for user_id, _token in recipients}
+        now = time.monotonic()
+        with self._lock:
+            for user_id in user_ids:
+                if user_id in self._pending:
+                    continue
+                attempt = attempts[user_id] + 1
+                if attempt >= self.max_attempts:
+                    self.stats["dropped"] += 1
+                    logger.warning("Dropping push notification for user %s after %d attempts", user_id, attempt)
+                    continue
+                self._pending[user_id] = events[user_id]
+                self._retries[user_id] = (attempt, now + self.retry_backoff * 2 ** (attempt - 1))
+                self.stats["requeued"] += 1
+
+
+def status_message(status, admin_comment):
+    title, body = STATUS_MESSAGES.get(status, ("Status updated", f"Your status is now {status}."))
+    if admin_comment:
+        body = f"{body} {admin_comment}"
+    if len(body) > MAX_BODY_LENGTH:
+        body = body[:MAX_BODY_LENGTH - 1].rstrip() + "\u2026"
+    return title, body, {"type": "seller_status", "status": status}
+
+
+_dispatcher = None
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        options = getattr(settings, "PUSH_NOTIFICATIONS", {})
+        if not options.get("ENABLED"):
+            return None
+        transport = import_string(options.get("TRANSPORT", "sellers.notifications.FirebaseTransport"))()
+        _dispatcher = NotificationDispatcher(
+            transport,
+            batch_size=options.get("BATCH_SIZE", 500),
+            flush_interval=options.get("FLUSH_INTERVAL", 1.0),
+            max_attempts=options.get("MAX_ATTEMPTS", 5),
+            retry_backoff=options.get("RETRY_BACKOFF", 2.0),
+        )
+    return _dispatcher
+
+
+def notify_status(profile):
+    dispatcher = get_dispatcher()
+    if dispatcher is not None:
+        dispatcher.enqueue(profile.user_id, profile.status, profile.admin_comment)
@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class DocumentCursorPagination(CursorPagination):
+    # Ids grow with every upload, so "-id" is newest first and stays stable
+    # while new documents arrive between pages.
+    ordering = "-id"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
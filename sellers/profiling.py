@@ -0,0 +1,398 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+HEADER = "X-Profile-Token"
+SIGNING_SALT = "sellers.profiling"
+MAX_STACK_DEPTH = 128
+TOP_FUNCTIONS = 40
+
+# The capture of the request being profiled, if any
+_capture = ContextVar("profiling_capture", default=None)
+
+
+def get_options():
+    return {
+        "ENABLED": False,
+        "ROOT": None,
+        "MAX_PROFILES": 200,
+        "SAMPLE_RATE": 0.0,
+        "SLOW_MS": None,
+        "SLOW_EXCLUDE": (),
+        "SAMPLE_INTERVAL": 0.005,
+        "TOKEN_MAX_AGE": 60 * 60,
+        "MAX_QUERIES": 1000,
+        **getattr(settings, "PROFILING", {}),
+    }
+
+
+def make_profile_token(user):
+    """Signed value for the X-Profile-Token header, valid for TOKEN_MAX_AGE."""
+    return signing.dumps({"by": user.pk}, salt=SIGNING_SALT)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time an external call (email, storage, push...) for the request being
+    profiled. Does nothing when the current request isn't profiled.
+    """
+    capture = _capture.get()
+    if capture is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        capture.spans.append({
+            "name": name,
+            "at_ms": capture.offset_ms(start),
+            "ms": (time.perf_counter() - start) * 1000,
+            "error": error,
+            **attrs,
+        })
+
+
+def record_sql(execute, sql, params, many, context):
+    capture = _capture.get()
+    if capture is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        capture.add_query(context["connection"].alias, sql, many, start)
+
+
+def install_sql_hook(sender=None, connection=None, **kwargs):
+    # Stays on the connection for good; costs one call per query when idle
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+class Capture:
+    """Everything recorded for one profiled request."""
+
+    def __init__(self, trigger, max_queries):
+        self.trigger = trigger
+        self.max_queries = max_queries
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.profiler = None
+        self.queries = []
+        self.dropped_queries = 0
+        self.spans = []
+        self.stacks = Counter()
+
+    def offset_ms(self, moment):
+        return (moment - self.started) * 1000
+
+    def add_query(self, alias, sql, many, start):
+        if len(self.queries) >= self.max_queries:
+            self.dropped_queries += 1
+            return
+        self.queries.append({
+            "alias": alias,
+            "sql": sql,
+            "many": many,
+            "at_ms": self.offset_ms(start),
+            "ms": (time.perf_counter() - start) * 1000,
+        })
+
+    def top_functions(self):
+        if self.profiler is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        return stream.getvalue()
+
+    def as_record(self, request, response):
+        user = getattr(request, "user", None)
+        match = getattr(request, "resolver_match", None)
+        return {
+            "created_at": timezone.now().isoformat(),
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "user_id": user.pk if user is not None and user.is_authenticated else None,
+            "trigger": self.trigger,
+            "duration_ms": self.duration_ms,
+            "query_count": len(self.queries) + self.dropped_queries,
+            "query_ms": sum(q["ms"] for q in self.queries),
+            "dropped_queries": self.dropped_queries,
+            "span_ms": sum(s["ms"] for s in self.spans),
+            "kind": "cprofile" if self.profiler is not None else "sampled",
+            "samples": sum(self.stacks.values()),
+            "queries": self.queries,
+            "spans": self.spans,
+            "stacks": dict(self.stacks.most_common()),
+            "top_functions": self.top_functions(),
+        }
+
+
+def fold_stack(frame):
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    A single per-process thread that records the stack of every watched
+    thread each ``interval`` seconds. It sleeps while nothing is watched.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def watch(self, thread_id, capture):
+        with self._lock:
+            self._watched[thread_id] = capture
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def unwatch(self, thread_id):
+        with self._lock:
+            self._watched.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                watched = dict(self._watched)
+            if not watched:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            frames = sys._current_frames()
+            for thread_id, capture in watched.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    capture.stacks[fold_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfileStore:
+    """
+    Keeps the newest ``max_profiles`` profiles on local disk: ``<id>.json``
+    with the request, SQL, spans and samples, plus ``<id>.prof`` (pstats
+    format) for cProfile captures. Older profiles are deleted on save.
+    """
+
+    SUMMARY_EXCLUDE = ("queries", "spans", "stacks", "top_functions")
+
+    def __init__(self, root=None, max_profiles=200):
+        self.root = Path(root or os.path.join(tempfile.gettempdir(), "request_profiles"))
+        self.max_profiles = max_profiles
+
+    def path(self, profile_id, suffix):
+        return self.root / f"{profile_id}{suffix}"
+
+    def save(self, record, profiler=None):
+        self.root.mkdir(parents=True, exist_ok=True)
+        profile_id = str(uuid.uuid4())
+        record = {"id": profile_id, **record}
+
+        if profiler is not None:
+            profiler.dump_stats(self.path(profile_id, ".prof"))
+        # The .json appears last and atomically, so listings never see half a profile
+        tmp = self.path(profile_id, ".json.tmp")
+        tmp.write_text(json.dumps(record, default=str))
+        os.replace(tmp, self.path(profile_id, ".json"))
+
+        self.trim()
+        return profile_id
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.root) if self.root.exists() else ():
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.name[:-len(".json")]))
+                except FileNotFoundError:
+                    continue
+        entries.sort(reverse=True)
+        return [profile_id for _mtime, profile_id in entries]
+
+    def trim(self):
+        for profile_id in self._entries()[self.max_profiles:]:
+            for suffix in (".json", ".prof"):
+                try:
+                    self.path(profile_id, suffix).unlink()
+                except FileNotFoundError:
+                    pass
+
+    def get(self, profile_id):
+        try:
+            return json.loads(self.path(profile_id, ".json").read_text())
+        except FileNotFoundError:
+            return None
+
+    def list(self):
+        summaries = []
+        for profile_id in self._entries():
+            record = self.get(profile_id)
+            if record is not None:
+                summaries.append({k: v for k, v in record.items() if k not in self.SUMMARY_EXCLUDE})
+        return summaries
+
+
+_store = None
+
+
+def get_profile_store():
+    global _store
+    if _store is None:
+        options = get_options()
+        _store = ProfileStore(options["ROOT"], options["MAX_PROFILES"])
+    return _store
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in request profiler. Removed from the stack entirely unless
+    ``PROFILING["ENABLED"]`` is set. When enabled, a request is profiled if:
+
+    * it carries a valid ``X-Profile-Token`` header (see make_profile_token),
+    * it is picked at random with probability ``SAMPLE_RATE``, or
+    * ``SLOW_MS`` is set and the request takes at least that long.
+
+    The first two run cProfile for the whole request. Slow-request capture
+    can't know up front which requests will be slow, so it uses the cheap
+    stack sampler instead and only keeps the profile if the threshold was
+    crossed. All three record SQL queries and ``span()`` timings.
+
+    Under ASGI the profiler and sampler follow the request's sync thread,
+    where the sync views run; time spent awaiting in async views shows up
+    only as queries, spans and total duration.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.options = get_options()
+        if not self.options["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.store = ProfileStore(self.options["ROOT"], self.options["MAX_PROFILES"])
+        self.sampler = StackSampler(self.options["SAMPLE_INTERVAL"]) if self.options["SLOW_MS"] is not None else None
+
+        connection_created.connect(install_sql_hook)
+        for connection in connections.all(initialized_only=True):
+            install_sql_hook(connection=connection)
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def trigger(self, request):
+        token = request.META.get("HTTP_" + HEADER.upper().replace("-", "_"))
+        if token:
+            try:
+                signing.loads(token, salt=SIGNING_SALT, max_age=self.options["TOKEN_MAX_AGE"])
+                return "header"
+            except signing.BadSignature:
+                pass
+        if self.options["SAMPLE_RATE"] and random.random() < self.options["SAMPLE_RATE"]:
+            return "sample"
+        if self.sampler is not None:
+            return "slow"
+        return None
+
+    def start(self, capture):
+        """Begin profiling on the calling thread and return its id."""
+        thread_id = threading.get_ident()
+        if capture.trigger == "slow":
+            self.sampler.watch(thread_id, capture)
+        else:
+            capture.profiler = cProfile.Profile()
+            capture.profiler.enable()
+        return thread_id
+
+    def stop(self, capture, thread_id):
+        if capture.profiler is not None:
+            capture.profiler.disable()
+        else:
+            self.sampler.unwatch(thread_id)
+        capture.duration_ms = capture.offset_ms(time.perf_counter())
+
+    def finish(self, request, response, capture):
+        if capture.trigger == "slow":
+            match = getattr(request, "resolver_match", None)
+            if capture.duration_ms < self.options["SLOW_MS"] or (match and match.url_name in self.options["SLOW_EXCLUDE"]):
+                return response
+        response["X-Profile-Id"] = self.store.save(capture.as_record(request, response), capture.profiler)
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        trigger = self.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        capture = Capture(trigger, self.options["MAX_QUERIES"])
+        token = _capture.set(capture)
+        thread_id = self.start(capture)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.stop(capture, thread_id)
+            _capture.reset(token)
+        return self.finish(request, response, capture)
+
+    async def __acall__(self, request):
+        trigger = self.trigger(request)
+        if trigger is None:
+            return await self.get_response(request)
+
+        capture = Capture(trigger, self.options["MAX_QUERIES"])
+        token = _capture.set(capture)
+        # Thread-sensitive, so this is the thread the request's sync views run in
+        thread_id = await sync_to_async(self.start)(capture)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(self.stop)(capture, thread_id)
+            _capture.reset(token)
+        return await sync_to_async(self.finish)(request, response, capture)
@@ -0,0 +1,216 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken, TokenVersion
+
+# Claim holding the user's token version at the time the token was issued
+VERSION_CLAIM = "ver"
+
+
+def get_options():
+    return {
+        "CAPACITY": 100_000,
+        "ERROR_RATE": 0.001,
+        "SYNC_INTERVAL": 5,
+        "SYNC_OVERLAP": 60,
+        "REBUILD_INTERVAL": 60 * 60,
+        "CACHE_SIZE": 10_000,
+        "REUSE_GRACE": 30,
+        **getattr(settings, "TOKEN_REVOCATION", {}),
+    }
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. The ``hashes`` bit positions of a
+    key come from one blake2b digest by double hashing.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    Process-local answer to "what token version is this user at?".
+
+    Users whose version was ever bumped are kept in a Bloom filter, so the
+    common case -- a user who never logged out everywhere -- costs a few
+    hash probes and no query. Only a positive answer reads the version from
+    the database, and that answer is cached until the row changes.
+
+    The filter is refreshed from rows changed since the previous sync at most
+    every ``SYNC_INTERVAL`` seconds, so a revocation made in another worker
+    takes effect here within that interval. It is rebuilt from scratch every
+    ``REBUILD_INTERVAL`` or once it holds more than its capacity.
+    """
+
+    def __init__(self, options=None):
+        self.options = options or get_options()
+        self._bloom = None
+        self._cache = LRUCache(maxsize=self.options["CACHE_SIZE"])
+        self._cache_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_at = None
+        self._built_at = None
+        self._watermark = None
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if self._bloom is not None and now - self._synced_at < self.options["SYNC_INTERVAL"]:
+            return
+        # Only the first build makes callers wait; later syncs run in one
+        # thread while the others keep using the current filter.
+        if not self._sync_lock.acquire(blocking=self._bloom is None):
+            return
+        try:
+            if self._bloom is not None and now - self._synced_at < self.options["SYNC_INTERVAL"]:
+                return
+            bloom = self._bloom
+            if bloom is None or bloom.count > bloom.capacity or now - self._built_at >= self.options["REBUILD_INTERVAL"]:
+                self.rebuild()
+            else:
+                self.sync()
+            self._synced_at = now
+        finally:
+            self._sync_lock.release()
+
+    def rebuild(self):
+        started = timezone.now()
+        revoked = TokenVersion.objects.filter(version__gt=0)
+        capacity = max(self.options["CAPACITY"], 2 * revoked.count())
+
+        bloom = BloomFilter(capacity, self.options["ERROR_RATE"])
+        for user_id in revoked.values_list("user_id", flat=True).iterator():
+            bloom.add(str(user_id))
+
+        with self._cache_lock:
+            self._bloom = bloom
+            self._cache.clear()
+        self._built_at = time.monotonic()
+        self._watermark = started
+
+    def sync(self):
+        started = timezone.now()
+        # Overlap the previous window: a row stamped just before the last sync
+        # may have committed just after it.
+        since = self._watermark - timedelta(seconds=self.options["SYNC_OVERLAP"])
+        for user_id, version in TokenVersion.objects.filter(updated_at__gte=since).values_list("user_id", "version"):
+            self.note_version(user_id, version)
+        self._watermark = started
+
+    def note_version(self, user_id, version):
+        key = str(user_id)
+        if self._bloom is not None:
+            self._bloom.add(key)
+        with self._cache_lock:
+            self._cache[key] = version
+
+    def user_version(self, user_id):
+        self._maybe_sync()
+        key = str(user_id)
+        if key not in self._bloom:
+            return 0
+
+        with self._cache_lock:
+            version = self._cache.get(key)
+        if version is None:
+            version = TokenVersion.objects.filter(user_id=user_id).values_list("version", flat=True).first() or 0
+            with self._cache_lock:
+                self._cache[key] = version
+        return version
+
+    def is_revoked(self, token):
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return False
+        return token.get(VERSION_CLAIM, 0) < self.user_version(user_id)
+
+
+_revocations = None
+
+
+def get_revocation_list():
+    global _revocations
+    if _revocations is None:
+        _revocations = RevocationList()
+    return _revocations
+
+
+def issue_tokens(user):
+    """A refresh token stamped with the user's current token version."""
+    refresh = RefreshToken.for_user(user)
+    # Read from the database: a revocation made in another worker may not
+    # have reached this process's filter yet.
+    refresh[VERSION_CLAIM] = TokenVersion.objects.filter(user=user).values_list("version", flat=True).first() or 0
+    return refresh
+
+
+def revoke_user(user_id):
+    """Invalidate every token issued to the user so far."""
+    with transaction.atomic():
+        TokenVersion.objects.get_or_create(user_id=user_id)
+        TokenVersion.objects.filter(user_id=user_id).update(version=F("version") + 1, updated_at=timezone.now())
+        version = TokenVersion.objects.values_list("version", flat=True).get(user_id=user_id)
+    transaction.on_commit(lambda: get_revocation_list().note_version(user_id, version))
+    return version
+
+
+def revoke_token(token):
+    """
+    Deny-list a single token until it expires. Returns False if it had
+    already been revoked.
+    """
+    _, created = RevokedToken.objects.get_or_create(
+        jti=token[api_settings.JTI_CLAIM],
+        defaults={
+            "user_id": token[api_settings.USER_ID_CLAIM],
+            "expires_at": datetime_from_epoch(token["exp"]),
+        },
+    )
+    return created
+
+
+def reused_within_grace(token):
+    """
+    True if ``token`` was revoked less than ``REUSE_GRACE`` seconds ago, as
+    when a client retries a refresh whose response it never received.
+    """
+    since = timezone.now() - timedelta(seconds=get_options()["REUSE_GRACE"])
+    return RevokedToken.objects.filter(jti=token[api_settings.JTI_CLAIM], created_at__gte=since).exists()
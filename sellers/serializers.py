@@ -1,20 +1,148 @@
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.db.models import Prefetch
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import SellerProfile, Document
 
-class DocumentSerializer(serializers.ModelSerializer):
+
+def sparse_params(request):
+    """
+    Read ``?fields=a,b,documents.doc_type`` and ``?expand=documents`` from the
+    query string. Each value is None when the parameter is absent.
+    """
+    def split(name):
+        raw = request.query_params.get(name)
+        if raw is None:
+            return None
+        return [part.strip() for part in raw.split(",") if part.strip()]
+
+    return split("fields"), split("expand")
+
+
+class SparseFieldsMixin:
+    """
+    Lets callers narrow a serializer with ``fields=`` / ``expand=``.
+
+    Without either argument the serializer renders everything, as before.
+    Once either is given, plain fields are limited to ``fields`` (all of them
+    if it is empty) and relations in ``expandable_fields`` are rendered only
+    when named in ``fields`` or ``expand``. ``relation.field`` entries narrow
+    the nested serializer. Unknown names raise a ValidationError (400).
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse = fields is not None or expand is not None
+        if not self.sparse:
+            return
+
+        fields, expand = fields or [], set(expand or [])
+        top_level = {name.split(".", 1)[0] for name in fields}
+        unknown = (top_level - set(self.fields)) | (expand - set(self.expandable_fields))
+        for name in self.expandable_fields:
+            if name in self.fields:
+                child = getattr(self.fields[name], "child", self.fields[name])
+                unknown.update(
+                    f for f in fields
+                    if f.startswith(name + ".") and f.split(".", 2)[1] not in child.fields
+                )
+        if unknown:
+            raise serializers.ValidationError({"fields": [f"Unknown field: {name}" for name in sorted(unknown)]})
+
+        for name in list(self.fields):
+            if name in self.expandable_fields:
+                keep = name in expand or name in top_level
+            else:
+                keep = not top_level or name in top_level
+            if not keep:
+                self.fields.pop(name)
+
+        for name in self.expandable_fields:
+            nested = [f.split(".", 1)[1] for f in fields if f.startswith(name + ".")]
+            if name in self.fields and nested:
+                field = self.fields[name]
+                child = getattr(field, "child", field)
+                self.fields[name] = type(child)(many=field is not child, read_only=True, fields=nested)
+
+    def model_columns(self):
+        """Concrete model columns needed to render the selected fields."""
+        concrete = {f.name for f in self.Meta.model._meta.concrete_fields}
+        return [field.source for field in self.fields.values() if field.source in concrete]
+
+    def project(self, queryset):
+        """
+        Narrow ``queryset`` to what this serializer will render: ``only()`` the
+        selected columns and prefetch just the expanded relations.
+        """
+        if not self.sparse:
+            return queryset.prefetch_related(*self.expandable_fields)
+
+        queryset = queryset.only(*self.model_columns())
+        for name in self.expandable_fields:
+            if name not in self.fields:
+                continue
+            field = self.fields[name]
+            child = getattr(field, "child", field)
+            relation = queryset.model._meta.get_field(name)
+            related_qs = child.project(relation.related_model.objects.all())
+            if getattr(child, "sparse", False):
+                # The prefetch needs the foreign key back to the parent row
+                related_qs = related_qs.only(*child.model_columns(), relation.field.name)
+            queryset = queryset.prefetch_related(Prefetch(name, queryset=related_qs))
+        return queryset
+
+
+_url_cache_options = getattr(settings, "DOCUMENT_URL_CACHE", {})
+_url_cache = TTLCache(maxsize=_url_cache_options.get("MAXSIZE", 10_000), ttl=_url_cache_options.get("TTL", 3600))
+_url_cache_lock = threading.Lock()
+
+
+class CachedFileField(serializers.FileField):
+    """
+    FileField that memoizes ``storage.url()`` per stored name in a bounded
+    TTL cache, so repeated polls don't rebuild every Cloudinary URL.
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+
+        with _url_cache_lock:
+            url = _url_cache.get(value.name)
+        if url is None:
+            url = value.url
+            with _url_cache_lock:
+                _url_cache[value.name] = url
+
+        request = self.context.get("request", None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class DocumentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    file = CachedFileField(max_length=100)
+
     class Meta:
         model = Document
         fields = ("id", "doc_type", "file", "uploaded_at")
 
-class SellerProfileSerializer(serializers.ModelSerializer):
+class SellerProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     documents = DocumentSerializer(many=True, read_only=True)
+    expandable_fields = ("documents",)
+
     class Meta:
         model = SellerProfile
         fields = ("id", "factory_name", "mobile", "gstin", "iec", "address", "geo_lat", "geo_long", "status", "admin_comment", "documents")
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     seller_profile = SellerProfileSerializer(read_only=True)
+    expandable_fields = ("seller_profile",)
+
     class Meta:
         model = User
         fields = ("id", "username", "email", "first_name", "last_name", "seller_profile")
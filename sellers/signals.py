@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .events import publish_status
+from .notifications import notify_status
+from .models import SellerProfile, StatusCounter, StatusTransition
+from .revocation import revoke_user
+
+
+TRACKED_FIELDS = {"status", "admin_comment"}
+
+
+def tracked_state(instance):
+    # Read from __dict__ so deferred fields are never loaded just for tracking
+    return instance.__dict__.get("status"), instance.__dict__.get("admin_comment")
+
+
+@receiver(pre_save, sender=SellerProfile)
+def lock_stored_state(sender, instance, using=None, update_fields=None, **kwargs):
+    """
+    Read the row's current status under a row lock, inside the transaction
+    SellerProfile.save() opens. Transitions and counters are derived from
+    this rather than from the instance, which may have been loaded before
+    a concurrent request changed the status.
+    """
+    instance._stored_state = None
+    instance._previous_status_changed_at = None
+    if instance._state.adding:
+        instance.status_changed_at = timezone.now()
+        return
+    if update_fields is not None and not TRACKED_FIELDS & set(update_fields):
+        instance._stored_state = tracked_state(instance)
+        return
+
+    row = (
+        SellerProfile.objects.using(using).select_for_update()
+        .filter(pk=instance.pk).values_list("status", "admin_comment", "status_changed_at").first()
+    )
+    if row is None:
+        instance.status_changed_at = timezone.now()
+        return
+    instance._stored_state = row[:2]
+    instance._previous_status_changed_at = row[2]
+    if instance.__dict__.get("status") != row[0]:
+        instance.status_changed_at = timezone.now()
+
+
+@receiver(post_save, sender=SellerProfile)
+def status_changed(sender, instance, created, update_fields=None, **kwargs):
+    state = tracked_state(instance)
+    stored = instance._stored_state
+    previous_status = stored[0] if stored is not None else None
+
+    if stored is None or state[0] != previous_status:
+        if update_fields is not None and "status_changed_at" not in update_fields:
+            SellerProfile.objects.filter(pk=instance.pk).update(status_changed_at=instance.status_changed_at)
+        record_transition(instance, previous_status)
+        if state[0] == "rejected" and stored is not None:
+            # Sessions opened before the rejection must sign in again
+            revoke_user(instance.user_id)
+
+    if stored is not None and state != stored:
+        transaction.on_commit(lambda: announce_status(instance))
+    instance._stored_state = state
+
+
+@receiver(post_delete, sender=SellerProfile)
+def status_removed(sender, instance, **kwargs):
+    if instance.status:
+        StatusCounter.bump(instance.status, count=-1)
+
+
+def announce_status(profile):
+    publish_status(profile)
+    notify_status(profile)
+
+
+def record_transition(profile, previous_status):
+    StatusTransition.objects.create(
+        seller=profile,
+        from_status=previous_status,
+        to_status=profile.status,
+        admin_comment=profile.admin_comment,
+        changed_by=getattr(profile, "_status_actor", None),
+    )
+
+    wait_seconds = None
+    entered_at = profile._previous_status_changed_at
+    if previous_status == "pending" and entered_at:
+        wait_seconds = (profile.status_changed_at - entered_at).total_seconds()
+
+    if previous_status:
+        StatusCounter.bump(previous_status, count=-1)
+    StatusCounter.bump(profile.status, count=1, entered=1, wait_seconds=wait_seconds)
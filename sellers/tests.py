@@ -1,3 +1,1138 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import msgpack
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, connections, transaction
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from backend.db_router import ReplicaHealth, ReplicaRouter, replica_health, replica_reads, routing_options
+
+from .events import InMemoryStatusBroker
+from .deletion import resume_deletion_jobs, run_deletion_job
+from .models import (
+    DeletionJob, DeviceToken, Document, EmailOTP, IdempotencyKey, MaintenanceRun, PasswordResetOTP, RevokedToken, SellerProfile, StatusCounter, StatusTransition,
+    UploadSession,
+)
+from .maintenance import purge, run_maintenance
+from .revocation import RevocationList, get_options as revocation_options, revoke_user
+from .profiling import HEADER as PROFILE_HEADER, ProfileStore, ProfilingMiddleware, make_profile_token
+from .notifications import FAILED, INVALID, MAX_BODY_LENGTH, FakeTransport, NotificationDispatcher, send_error
+from .utils.chunked_upload import LocalChunkStore
+from .views import get_tokens_for_user
+
+
+def status_counts():
+    return dict(StatusCounter.objects.values_list("status", "count"))
+
+
+def use_local_storage(test, storage_class=FileSystemStorage):
+    """Swap Cloudinary for a temporary local storage for the rest of the test."""
+    root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, root, ignore_errors=True)
+    storage = storage_class(location=root)
+    patcher = mock.patch.object(Document._meta.get_field("file"), "storage", storage)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return storage
+
+
+def auth_header(user):
+    return {"HTTP_AUTHORIZATION": f"Bearer {get_tokens_for_user(user)['access']}"}
+
+
+class StatusTransitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="seller@example.com")
+        self.profile = SellerProfile.objects.create(user=self.user, factory_name="Factory", status="pending")
+
+    def test_stale_instances_use_the_stored_status(self):
+        first = SellerProfile.objects.get(pk=self.profile.pk)
+        second = SellerProfile.objects.get(pk=self.profile.pk)
+
+        first.status = "approved"
+        first.save()
+        second.status = "rejected"
+        second.save(update_fields=["status"])
+
+        self.assertEqual(status_counts(), {"pending": 0, "approved": 0, "rejected": 1})
+        transitions = StatusTransition.objects.filter(seller=self.profile).order_by("pk")
+        self.assertEqual(
+            list(transitions.values_list("from_status", "to_status")),
+            [(None, "pending"), ("pending", "approved"), ("approved", "rejected")],
+        )
+
+    def test_saving_other_fields_records_nothing(self):
+        self.profile.factory_name = "Renamed"
+        self.profile.save(update_fields=["factory_name"])
+        self.profile.save()
+
+        self.assertEqual(StatusTransition.objects.filter(seller=self.profile).count(), 1)
+        self.assertEqual(status_counts(), {"pending": 1})
+
+
+@mock.patch("sellers.views.send_email_otp")
+class IdempotencyTests(TestCase):
+    def signup(self, email, key="abc", **extra):
+        body = {"email": email, "mobile": "9999999999", "password": "secret", **extra}
+        return self.client.post("/api/auth/signup/", body, content_type="application/json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_is_replayed(self, send_email_otp):
+        first = self.signup("k1@example.com")
+        retry = self.signup("k1@example.com")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(send_email_otp.call_count, 1)
+
+    def test_anonymous_callers_do_not_share_keys(self, send_email_otp):
+        first = self.signup("k1@example.com")
+        second = self.signup("k2@example.com")
+
+        self.assertEqual(second.status_code, 201)
+        self.assertFalse(second.has_header("Idempotent-Replayed"))
+        self.assertNotEqual(second.json()["userId"], first.json()["userId"])
+        self.assertTrue(User.objects.filter(username="k2@example.com").exists())
+
+    def test_key_reused_with_a_different_body(self, send_email_otp):
+        self.signup("k1@example.com")
+        response = self.signup("k1@example.com", mobile="8888888888")
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_server_errors_are_not_stored(self, send_email_otp):
+        send_email_otp.side_effect = RuntimeError("mail is down")
+        self.client.raise_request_exception = False
+
+        self.assertEqual(self.signup("k1@example.com").status_code, 500)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+
+@mock.patch("sellers.views.send_email_otp")
+class SignupTests(TestCase):
+    def signup(self, password="secret", email="seller@example.com"):
+        return self.client.post("/api/auth/signup/", {
+            "email": email, "mobile": "9999999999", "password": password,
+        }, content_type="application/json")
+
+    def test_unverified_retry_with_the_same_password_gets_a_new_otp(self, send_email_otp):
+        first = self.signup()
+        retry = self.signup()
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()["userId"], first.json()["userId"])
+        self.assertEqual(User.objects.filter(username="seller@example.com").count(), 1)
+        otps = list(EmailOTP.objects.filter(email="seller@example.com").values_list("otp", flat=True))
+        self.assertEqual(len(otps), 2)
+        self.assertEqual(send_email_otp.call_count, 2)
+        self.assertEqual(send_email_otp.call_args.args[1], otps[-1])
+
+    def test_retry_with_a_different_password_is_rejected(self, send_email_otp):
+        self.signup()
+        response = self.signup(password="other")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(EmailOTP.objects.filter(email="seller@example.com").count(), 1)
+        self.assertEqual(send_email_otp.call_count, 1)
+
+    def test_active_account_is_rejected(self, send_email_otp):
+        self.signup()
+        User.objects.filter(username="seller@example.com").update(is_active=True)
+        response = self.signup()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(send_email_otp.call_count, 1)
+
+    def test_integrity_error_rolls_back_the_whole_signup(self, send_email_otp):
+        with mock.patch.object(EmailOTP.objects, "create", side_effect=IntegrityError):
+            response = self.signup()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(username="seller@example.com").exists())
+        self.assertFalse(SellerProfile.objects.exists())
+        send_email_otp.assert_not_called()
+
+        # Nothing half-created blocks the next attempt
+        self.assertEqual(self.signup().status_code, 201)
+
+
+class APICookieTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="seller@example.com", password=make_password("secret"))
+        SellerProfile.objects.create(user=self.user, factory_name="Factory", status="pending")
+
+    def test_api_responses_set_no_cookies(self):
+        responses = [
+            self.client.post(
+                "/api/auth/login/", {"email": "seller@example.com", "password": "secret"},
+                content_type="application/json",
+            ),
+            self.client.get(f"/api/seller/status/{self.user.id}/"),
+            self.client.get("/api/user/me/", **auth_header(self.user)),
+        ]
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("sessionid", response.cookies)
+            self.assertNotIn("csrftoken", response.cookies)
+        self.assertEqual(dict(self.client.cookies), {})
+
+    def test_admin_still_uses_csrf_and_sessions(self):
+        response = self.client.get("/admin/login/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("csrftoken", response.cookies)
+
+        User.objects.create_superuser("admin", "admin@example.com", "secret")
+        csrf_client = self.client_class(enforce_csrf_checks=True)
+        self.assertEqual(csrf_client.post("/admin/login/", {"username": "admin", "password": "secret"}).status_code, 403)
+
+        response = self.client.post("/admin/login/", {"username": "admin", "password": "secret"})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("sessionid", response.cookies)
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    A second connection to the test database stands in for the replica, the
+    way replicas mirror default under the test runner.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings["replica_0"] = {**connections.settings["default"]}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica_0"].close()
+        del connections["replica_0"]
+        del connections.settings["replica_0"]
+        super().tearDownClass()
+
+    def setUp(self):
+        # Connect up front: the test runner refuses to open connections to
+        # aliases it didn't set up itself
+        connections["replica_0"].connect()
+        for target in ("backend.db_router.replica_aliases", "backend.middleware.replica_aliases"):
+            patcher = mock.patch(target, return_value=["replica_0"])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        replica_health._checked.clear()
+
+        self.user = User.objects.create(username="seller@example.com")
+        SellerProfile.objects.create(user=self.user, factory_name="Factory", status="pending")
+
+    def request(self, method, path, token=None, **extra):
+        token = token or get_tokens_for_user(self.user)["access"]
+        with CaptureQueriesContext(connections["replica_0"]) as queries:
+            response = getattr(self.client, method)(path, HTTP_AUTHORIZATION=f"Bearer {token}", **extra)
+        self.assertLess(response.status_code, 400)
+        return response, len(queries)
+
+    def replica_queries(self, method, path, token=None, **extra):
+        return self.request(method, path, token, **extra)[1]
+
+    def write(self):
+        response, queries = self.request(
+            "patch", "/api/seller/update-status/", data={"status": "pending"}, content_type="application/json"
+        )
+        self.assertEqual(queries, 0)
+        return response["X-Replica-Pin"]
+
+    def test_get_reads_from_the_replica(self):
+        response, queries = self.request("get", "/api/user/me/")
+        self.assertGreater(queries, 0)
+        self.assertFalse(response.has_header("X-Replica-Pin"))
+
+    def test_write_pins_the_client_to_the_primary(self):
+        pin = self.write()
+
+        # Checking the pin touches neither database
+        with CaptureQueriesContext(connections["default"]) as primary:
+            self.assertEqual(self.replica_queries("get", "/api/user/me/", HTTP_X_REPLICA_PIN=pin), 0)
+        self.assertFalse(any("cache" in query["sql"] for query in primary))
+        # Clients that don't send it back read from the replica
+        self.assertGreater(self.replica_queries("get", "/api/user/me/"), 0)
+
+    def test_forged_or_expired_pins_are_ignored(self):
+        pin = self.write()
+        self.assertGreater(self.replica_queries("get", "/api/user/me/", HTTP_X_REPLICA_PIN=pin + "x"), 0)
+
+        issued = int(timezone.now().timestamp()) - routing_options()["STICKY_SECONDS"] - 1
+        with mock.patch.object(signing.TimestampSigner, "timestamp", return_value=signing.b62_encode(issued)):
+            expired = self.write()
+        self.assertGreater(self.replica_queries("get", "/api/user/me/", HTTP_X_REPLICA_PIN=expired), 0)
+
+    def test_issuing_tokens_pins_the_client(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("secret"))
+        response = self.client.post(
+            "/api/auth/login/", {"email": "seller@example.com", "password": "secret"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header("X-Replica-Pin"))
+
+    def test_unhealthy_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(replica_health, "check", return_value=False):
+            self.assertEqual(self.replica_queries("get", "/api/user/me/"), 0)
+
+    def test_lagging_replica_is_unhealthy(self):
+        replica = mock.MagicMock(vendor="postgresql")
+        replica.cursor.return_value.__enter__.return_value.fetchone.return_value = (30.0,)
+        with mock.patch("backend.db_router.connections", {"replica_0": replica}):
+            self.assertFalse(ReplicaHealth().check("replica_0", max_lag=5))
+
+        replica.cursor.return_value.__enter__.return_value.fetchone.return_value = (1.0,)
+        with mock.patch("backend.db_router.connections", {"replica_0": replica}):
+            self.assertTrue(ReplicaHealth().check("replica_0", max_lag=5))
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        router = ReplicaRouter()
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(router.db_for_read(SellerProfile), "replica_0")
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(SellerProfile))
+        finally:
+            replica_reads.reset(token)
+
+
+class NotificationDispatcherTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f"seller{i}@example.com") for i in range(5)]
+        for user in self.users:
+            DeviceToken.objects.create(user=user, token=f"token-{user.pk}")
+
+    def dispatcher(self, transport, batch_size=500):
+        return NotificationDispatcher(transport, batch_size=batch_size, background=False)
+
+    def test_events_are_coalesced_per_user(self):
+        transport = FakeTransport()
+        dispatcher = self.dispatcher(transport)
+        user = self.users[0]
+
+        dispatcher.enqueue(user.pk, "pending")
+        dispatcher.enqueue(user.pk, "approved")
+        dispatcher.flush()
+
+        self.assertEqual(len(transport.calls), 1)
+        self.assertEqual(transport.calls[0]["tokens"], [f"token-{user.pk}"])
+        self.assertEqual(transport.calls[0]["data"]["status"], "approved")
+
+    def test_same_message_shares_batches(self):
+        transport = FakeTransport()
+        dispatcher = self.dispatcher(transport, batch_size=2)
+
+        for user in self.users:
+            dispatcher.enqueue(user.pk, "approved")
+        dispatcher.flush()
+
+        self.assertEqual([len(call["tokens"]) for call in transport.calls], [2, 2, 1])
+        self.assertEqual(dispatcher.stats["sent"], 5)
+
+    def test_invalid_tokens_are_pruned(self):
+        stale = f"token-{self.users[0].pk}"
+        dispatcher = self.dispatcher(FakeTransport(invalid_tokens={stale}))
+
+        for user in self.users:
+            dispatcher.enqueue(user.pk, "approved")
+        dispatcher.flush()
+
+        self.assertFalse(DeviceToken.objects.filter(token=stale).exists())
+        self.assertEqual(DeviceToken.objects.count(), 4)
+
+    def test_long_comments_are_truncated(self):
+        transport = FakeTransport()
+        dispatcher = self.dispatcher(transport)
+
+        dispatcher.enqueue(self.users[0].pk, "rejected", "x" * 5000)
+        dispatcher.flush()
+
+        self.assertEqual(len(transport.calls[0]["body"]), MAX_BODY_LENGTH)
+
+    def test_failed_batches_are_requeued(self):
+        transport = FakeTransport(invalid_tokens=DeviceToken.objects.values_list("token", flat=True))
+        dispatcher = self.dispatcher(transport, batch_size=2)
+        for user in self.users:
+            dispatcher.enqueue(user.pk, "approved")
+
+        send = transport.send_multicast
+        responses = iter([send, ConnectionError("FCM is down")])
+
+        def flaky(*args):
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response(*args)
+
+        with mock.patch.object(transport, "send_multicast", side_effect=flaky):
+            with self.assertRaises(ConnectionError):
+                dispatcher.flush()
+
+        # The first batch went out and its invalid tokens were still pruned
+        self.assertEqual(DeviceToken.objects.count(), 3)
+        self.assertEqual(len(dispatcher._pending), 3)
+
+        # Held back until the backoff has passed
+        dispatcher.flush()
+        self.assertEqual(len(transport.calls), 1)
+
+        with mock.patch("sellers.notifications.time.monotonic", return_value=time.monotonic() + 2):
+            dispatcher.flush()
+        self.assertEqual(sorted(len(call["tokens"]) for call in transport.calls), [1, 2, 2])
+        self.assertEqual(dispatcher._retries, {})
+
+    def test_retries_back_off_and_give_up(self):
+        transport = FakeTransport()
+        dispatcher = NotificationDispatcher(transport, background=False, max_attempts=3, retry_backoff=1.0)
+        user = self.users[0]
+        dispatcher.enqueue(user.pk, "approved")
+
+        clock = time.monotonic()
+        with mock.patch.object(transport, "send_multicast", side_effect=ConnectionError("FCM is down")) as send:
+            with mock.patch("sellers.notifications.time.monotonic", side_effect=lambda: clock):
+                for delay in (1.0, 2.0):
+                    with self.assertRaises(ConnectionError):
+                        dispatcher.flush()
+                    retry_at = dispatcher._retries[user.pk][1]
+                    self.assertEqual(retry_at - clock, delay)
+
+                    clock = retry_at - 0.1
+                    dispatcher.flush()  # too early, nothing is sent
+                    clock = retry_at
+
+                with self.assertRaises(ConnectionError):
+                    dispatcher.flush()
+
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(dispatcher.stats["dropped"], 1)
+        self.assertEqual(dispatcher._pending, {})
+        self.assertEqual(dispatcher._retries, {})
+
+    def test_a_newer_event_resets_the_attempts(self):
+        transport = FakeTransport()
+        dispatcher = self.dispatcher(transport)
+        user = self.users[0]
+        dispatcher.enqueue(user.pk, "pending")
+        with mock.patch.object(transport, "send_multicast", side_effect=ConnectionError("FCM is down")):
+            with self.assertRaises(ConnectionError):
+                dispatcher.flush()
+
+        dispatcher.enqueue(user.pk, "approved")
+        dispatcher.flush()
+        self.assertEqual([call["data"]["status"] for call in transport.calls], ["approved"])
+
+    def test_only_token_errors_count_as_invalid(self):
+        from firebase_admin import exceptions, messaging
+
+        self.assertEqual(send_error(messaging.UnregisteredError("Requested entity was not found.")), INVALID)
+        self.assertEqual(
+            send_error(exceptions.InvalidArgumentError("The registration token is not a valid FCM registration token")),
+            INVALID,
+        )
+        self.assertEqual(send_error(exceptions.InvalidArgumentError("Message payload is too large")), FAILED)
+
+
+class FlakyStorage(FileSystemStorage):
+    """Local storage standing in for Cloudinary; deletes of names in ``broken`` raise."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.broken = set()
+
+    def delete(self, name):
+        if name in self.broken:
+            raise ConnectionError(f"cannot delete {name}")
+        super().delete(name)
+
+
+class DeletionJobTests(TestCase):
+    options = {"RETRIES": 1, "RETRY_BACKOFF": 0, "STORAGE_CONCURRENCY": 2, "CHUNK_SIZE": 2}
+
+    def setUp(self):
+        self.storage = use_local_storage(self, FlakyStorage)
+
+        self.user = User.objects.create(username="seller@example.com", is_active=False)
+        profile = SellerProfile.objects.create(user=self.user, factory_name="Factory")
+        self.names = []
+        for number in range(5):
+            name = self.storage.save(f"seller_docs/{profile.pk}/doc_{number}.pdf", ContentFile(b"%PDF"))
+            Document.objects.create(seller=profile, doc_type="gst", file=name)
+            self.names.append(name)
+        self.job = DeletionJob.objects.create(user_id=self.user.pk, username=self.user.username)
+
+    def test_job_deletes_files_rows_and_user(self):
+        job = run_deletion_job(self.job.pk, self.options)
+
+        self.assertEqual(job.status, "done")
+        self.assertEqual((job.documents_deleted, job.files_deleted, job.files_failed), (5, 5, 0))
+        self.assertFalse(any(self.storage.exists(name) for name in self.names))
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_failed_files_keep_their_rows_and_are_retried(self):
+        self.storage.broken = {self.names[1]}
+
+        job = run_deletion_job(self.job.pk, self.options)
+
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.files_failed, 1)
+        self.assertEqual(job.failed_files, [self.names[1]])
+        self.assertEqual(list(Document.objects.values_list("file", flat=True)), [self.names[1]])
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+        self.storage.broken = set()
+        self.assertEqual(resume_deletion_jobs(self.options), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        self.assertEqual(job.documents_deleted, 5)
+        self.assertFalse(self.storage.exists(self.names[1]))
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_stale_running_job_is_resumed(self):
+        DeletionJob.objects.filter(pk=self.job.pk).update(status="running", attempts=1, updated_at=timezone.now())
+        self.assertIsNone(run_deletion_job(self.job.pk, self.options))
+        self.assertEqual(resume_deletion_jobs(self.options), 0)
+
+        DeletionJob.objects.filter(pk=self.job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(resume_deletion_jobs(self.options), 1)
+
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.attempts), ("done", 2))
+        self.assertFalse(Document.objects.exists())
+
+    def test_account_queued_for_deletion_cannot_be_reactivated(self):
+        EmailOTP.objects.create(email=self.user.username, otp="123456", expires_at=timezone.now() + timedelta(minutes=5))
+
+        with mock.patch("sellers.views.send_email_otp") as send_email_otp:
+            sent = self.client.post("/api/auth/send-otp/", {"email": self.user.username}, content_type="application/json")
+        verified = self.client.post(
+            "/api/auth/verify-otp/", {"email": self.user.username, "otp": "123456"}, content_type="application/json"
+        )
+
+        self.assertEqual(sent.status_code, 404)
+        send_email_otp.assert_not_called()
+        self.assertEqual(verified.status_code, 404)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    def test_account_queued_for_deletion_is_hidden(self):
+        for path in ("", "poll/", "stream/"):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(f"/api/seller/status/{self.user.pk}/{path}").status_code, 404)
+
+        admin = User.objects.create(username="admin@example.com", is_staff=True, is_superuser=True)
+        response = self.client.post(
+            f"/api/admin/approve/{self.user.pk}/", {"status": "approved"}, content_type="application/json",
+            **auth_header(admin),
+        )
+        self.assertEqual(response.status_code, 409)
+
+        self.client.force_login(admin)
+        self.client.post("/admin/sellers/sellerprofile/", {
+            "action": "approve_selected", "_selected_action": [self.user.seller_profile.pk],
+        })
+        self.assertEqual(SellerProfile.objects.get(user=self.user).status, "new")
+
+        # Visible again if the job is gone
+        DeletionJob.objects.all().delete()
+        self.assertEqual(self.client.get(f"/api/seller/status/{self.user.pk}/").status_code, 200)
+
+    def test_repeated_delete_requests_share_one_job(self):
+        user = User.objects.create(username="other@example.com")
+        SellerProfile.objects.create(user=user, factory_name="Other")
+        admin = User.objects.create(username="admin@example.com", is_staff=True)
+
+        with mock.patch("sellers.views.schedule_deletion") as schedule:
+            first = self.client.delete(f"/api/auth/delete-user/{user.pk}/", **auth_header(admin))
+            second = self.client.delete(f"/api/auth/delete-user/{user.pk}/", **auth_header(admin))
+
+        self.assertEqual((first.status_code, second.status_code), (202, 202))
+        self.assertEqual(first.json()["jobId"], second.json()["jobId"])
+        self.assertEqual(DeletionJob.objects.filter(user_id=user.pk).count(), 1)
+        schedule.assert_called_once()
+        self.assertEqual(self.client.delete("/api/auth/delete-user/0/", **auth_header(admin)).status_code, 404)
+
+
+class ChunkedUploadTests(TestCase):
+    data = bytes(range(256)) * 4
+
+    def setUp(self):
+        use_local_storage(self)
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        patcher = mock.patch("sellers.utils.chunked_upload._store", LocalChunkStore(root))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create(username="seller@example.com")
+        SellerProfile.objects.create(user=self.user, factory_name="Factory")
+        self.auth = auth_header(self.user)
+        response = self.client.post(
+            "/api/seller/uploads/",
+            {"doc_type": "GST", "filename": "gst.pdf", "size": len(self.data)},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.upload_id = response.json()["uploadId"]
+
+    def put_chunk(self, start, end, checksum=None, **extra):
+        chunk = self.data[start:end]
+        return self.client.put(
+            f"/api/seller/uploads/{self.upload_id}/",
+            chunk,
+            content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(start),
+            HTTP_UPLOAD_CHECKSUM=checksum or hashlib.sha256(chunk).hexdigest(),
+            **self.auth,
+            **extra,
+        )
+
+    def complete(self):
+        return self.client.post(f"/api/seller/uploads/{self.upload_id}/complete/", **self.auth)
+
+    def test_out_of_order_and_overlapping_chunks_assemble(self):
+        self.put_chunk(600, 1024)
+        self.put_chunk(0, 400)
+        response = self.put_chunk(300, 700)
+        self.assertEqual(response.json()["ranges"], [[0, 1024]])
+
+        response = self.complete()
+        self.assertEqual(response.status_code, 200)
+        document = Document.objects.get(pk=response.json()["document"]["id"])
+        with document.file.open("rb") as fh:
+            self.assertEqual(fh.read(), self.data)
+
+    def test_checksum_mismatch(self):
+        response = self.put_chunk(0, 512, checksum="0" * 64)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.put_chunk(0, 0, checksum="x").status_code, 416)
+        self.assertEqual(self.client.get(f"/api/seller/uploads/{self.upload_id}/", **self.auth).json()["ranges"], [])
+
+    def test_truncated_body(self):
+        # The connection drops after 100 of the announced 512 bytes
+        body = io.BytesIO(self.data[:100])
+        response = self.put_chunk(0, 512, CONTENT_LENGTH="512", **{"wsgi.input": body})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(f"/api/seller/uploads/{self.upload_id}/", **self.auth).json()["received"], 0)
+
+    def test_complete_with_missing_ranges(self):
+        self.put_chunk(0, 512)
+
+        response = self.complete()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["ranges"], [[0, 512]])
+        self.assertEqual(UploadSession.objects.get(pk=self.upload_id).status, "open")
+
+    def test_second_complete_returns_the_same_document(self):
+        self.put_chunk(0, 1024)
+
+        first = self.complete()
+        second = self.complete()
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()["document"]["id"], first.json()["document"]["id"])
+        self.assertEqual(Document.objects.count(), 1)
+        self.assertEqual(self.put_chunk(0, 1024).json()["detail"], "Upload already completed")
+
+    def test_stale_claim_is_taken_over(self):
+        self.put_chunk(0, 1024)
+        UploadSession.objects.filter(pk=self.upload_id).update(status="assembling", updated_at=timezone.now())
+
+        self.assertEqual(self.complete().status_code, 409)
+        self.assertEqual(self.put_chunk(0, 1024).json()["detail"], "Upload is being completed")
+
+        UploadSession.objects.filter(pk=self.upload_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.complete().status_code, 200)
+        self.assertEqual(UploadSession.objects.get(pk=self.upload_id).status, "complete")
+
+
+@mock.patch("sellers.views.send_email_otp")
+class RendererTests(TestCase):
+    body = {"email": "seller@example.com", "mobile": "9999999999", "password": "secret"}
+
+    def test_msgpack_request_and_response(self, send_email_otp):
+        response = self.client.post(
+            "/api/auth/signup/",
+            msgpack.packb(self.body),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content)["detail"], "OTP sent to email")
+        self.assertTrue(User.objects.filter(username="seller@example.com").exists())
+
+    def test_json_is_still_the_default(self, send_email_otp):
+        response = self.client.post("/api/auth/signup/", self.body, content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("userId", response.json())
+
+    def test_malformed_bodies_are_rejected(self, send_email_otp):
+        for content_type, body in (
+            ("application/msgpack", b"\xc1"),
+            ("application/msgpack", b"\x92\x01"),
+            ("application/json", b'{"email": '),
+        ):
+            with self.subTest(content_type=content_type, body=body):
+                response = self.client.post("/api/auth/signup/", body, content_type=content_type)
+                self.assertEqual(response.status_code, 400)
+
+        send_email_otp.assert_not_called()
+
+
+@override_settings(STATUS_EVENTS={"HEARTBEAT": 5, "STREAM_TIMEOUT": 5, "LONG_POLL_TIMEOUT": 5, "RETRY_MS": 3000})
+class StatusEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="seller@example.com")
+        self.profile = SellerProfile.objects.create(user=self.user, factory_name="Factory", status="pending")
+        self.broker = InMemoryStatusBroker()
+        patcher = mock.patch("sellers.events._broker", self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def approve(self, execute=True):
+        with self.captureOnCommitCallbacks(execute=execute) as callbacks:
+            self.profile.status = "approved"
+            self.profile.admin_comment = "Welcome"
+            self.profile.save()
+        return callbacks
+
+    async def subscribed(self):
+        while not self.broker.waiting():
+            await asyncio.sleep(0.01)
+
+    async def test_stream_sends_current_state_then_changes(self):
+        response = await self.async_client.get(f"/api/seller/status/{self.user.id}/stream/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+
+        self.assertEqual(await anext(chunks), b"retry: 3000\n")
+        self.assertIn(b'"status": "pending"', await anext(chunks))
+
+        await sync_to_async(self.approve)()
+        event = await asyncio.wait_for(anext(chunks), timeout=1)
+        self.assertTrue(event.startswith(b"event: status\n"))
+        self.assertIn(b'"status": "approved"', event)
+        self.assertIn(b'"admin_comment": "Welcome"', event)
+
+    async def test_stream_unknown_seller(self):
+        response = await self.async_client.get("/api/seller/status/0/stream/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.broker.waiting(), 0)
+
+    async def test_poll_returns_immediately_when_status_differs(self):
+        response = await self.async_client.get(f"/api/seller/status/{self.user.id}/poll/?status=approved")
+        self.assertEqual(response.json(), {"status": "pending", "admin_comment": None})
+
+    async def test_poll_waits_for_the_next_change(self):
+        poll = asyncio.create_task(
+            self.async_client.get(f"/api/seller/status/{self.user.id}/poll/?status=pending")
+        )
+        await asyncio.wait_for(self.subscribed(), timeout=1)
+        self.assertFalse(poll.done())
+
+        await sync_to_async(self.approve)()
+        response = await asyncio.wait_for(poll, timeout=1)
+        self.assertEqual(response.json(), {"status": "approved", "admin_comment": "Welcome"})
+        self.assertEqual(self.broker.waiting(), 0)
+
+    async def test_event_is_published_only_after_commit(self):
+        poll = asyncio.create_task(
+            self.async_client.get(f"/api/seller/status/{self.user.id}/poll/?status=pending")
+        )
+        await asyncio.wait_for(self.subscribed(), timeout=1)
+
+        callbacks = await sync_to_async(self.approve)(execute=False)
+        await asyncio.sleep(0.1)
+        self.assertFalse(poll.done())
+
+        await sync_to_async(lambda: [callback() for callback in callbacks])()
+        response = await asyncio.wait_for(poll, timeout=1)
+        self.assertEqual(response.json()["status"], "approved")
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        use_local_storage(self)
+        self.user = User.objects.create(username="seller@example.com", email="seller@example.com")
+        self.profile = SellerProfile.objects.create(user=self.user, factory_name="Factory", status="pending")
+        Document.objects.bulk_create(
+            Document(seller=self.profile, doc_type=f"doc_{i}", file=f"seller_docs/doc_{i}.pdf") for i in range(3)
+        )
+        self.url = f"/api/seller/status/{self.user.id}/"
+
+    def get(self, url, queries, **extra):
+        with CaptureQueriesContext(connections["default"]) as captured:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200, response.content)
+        document_queries = [q["sql"] for q in captured if "sellers_document" in q["sql"]]
+        self.assertEqual(len(captured), queries, [q["sql"] for q in captured])
+        return response.json(), document_queries
+
+    def test_full_payload_by_default(self):
+        data, document_queries = self.get(self.url, queries=2)
+        self.assertEqual(len(data["profile"]["documents"]), 3)
+        self.assertEqual(len(document_queries), 1)
+
+    def test_documents_are_not_prefetched_unless_requested(self):
+        data, document_queries = self.get(self.url + "?fields=status,factory_name", queries=1)
+        self.assertEqual(data["profile"], {"factory_name": "Factory", "status": "pending"})
+        self.assertEqual(document_queries, [])
+
+    def test_expanded_documents_can_be_narrowed(self):
+        data, document_queries = self.get(self.url + "?fields=status,documents.doc_type", queries=2)
+        self.assertEqual(data["profile"]["documents"], [{"doc_type": f"doc_{i}"} for i in range(3)])
+        self.assertNotIn("file", document_queries[0])
+
+    def test_user_me_queries(self):
+        headers = auth_header(self.user)
+        self.client.get("/api/user/me/", **headers)  # loads the revocation list once
+
+        full, _ = self.get("/api/user/me/", queries=3, **headers)
+        self.assertEqual(len(full["profile"]["documents"]), 3)
+
+        sparse, document_queries = self.get("/api/user/me/?fields=status", queries=2, **headers)
+        self.assertEqual(sparse["profile"], {"status": "pending"})
+        self.assertEqual(document_queries, [])
+
+    def test_unknown_fields_are_rejected(self):
+        for query in ("?fields=bogus", "?fields=status,documents.bogus", "?expand=bogus"):
+            with self.subTest(query=query):
+                response = self.client.get(self.url + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("fields", response.json())
+
+
+class SellerDocumentsTests(TestCase):
+    def setUp(self):
+        use_local_storage(self)
+        self.user = User.objects.create(username="seller@example.com")
+        self.profile = SellerProfile.objects.create(user=self.user, factory_name="Factory", status="pending")
+        # Two uploads of each type, the second one replacing the first
+        self.documents = [
+            Document.objects.create(seller=self.profile, doc_type=doc_type, file=f"seller_docs/{doc_type}_{n}.pdf")
+            for n in range(2) for doc_type in ("gst_certificate", "pan_card", "factory_photo")
+        ]
+        self.url = f"/api/seller/documents/{self.user.id}/"
+
+    def get(self, query="", user=None, url=None):
+        response = self.client.get(url or self.url + query, **auth_header(user or self.user))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, data):
+        return [document["id"] for document in data["results"]]
+
+    def test_latest_document_of_each_type_by_default(self):
+        self.assertEqual(self.ids(self.get()), [d.id for d in reversed(self.documents[3:])])
+
+    def test_history_lists_every_upload(self):
+        self.assertEqual(self.ids(self.get("?history=true")), [d.id for d in reversed(self.documents)])
+
+    def test_filter_by_doc_type(self):
+        pan_cards = [d.id for d in reversed(self.documents) if d.doc_type == "pan_card"]
+        self.assertEqual(self.ids(self.get("?doc_type=pan_card")), pan_cards[:1])
+        self.assertEqual(self.ids(self.get("?doc_type=pan_card&history=1")), pan_cards)
+
+    def test_cursor_pages_cover_every_document_once(self):
+        page = self.get("?history=true&page_size=4")
+        seen = self.ids(page)
+        self.assertIsNone(page["previous"])
+
+        page = self.get(url=page["next"])
+        seen += self.ids(page)
+        self.assertIsNone(page["next"])
+        self.assertEqual(seen, [d.id for d in reversed(self.documents)])
+
+    def test_other_sellers_get_404_but_staff_may_look(self):
+        other = User.objects.create(username="other@example.com")
+        response = self.client.get(self.url, **auth_header(other))
+        self.assertEqual(response.status_code, 404)
+
+        staff = User.objects.create(username="staff@example.com", is_staff=True)
+        self.assertEqual(len(self.get(user=staff)["results"]), 3)
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class DeviceTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="seller@example.com")
+        self.url = "/api/seller/devices/"
+
+    def post(self, user, **data):
+        return self.client.post(self.url, data, content_type="application/json", **auth_header(user))
+
+    def test_register_and_unregister(self):
+        self.assertEqual(self.post(self.user, token="abc", platform="android").status_code, 201)
+        self.assertEqual(self.post(self.user, token="abc", platform="android").status_code, 200)
+        self.assertEqual(list(DeviceToken.objects.values_list("user", "token", "platform")),
+                         [(self.user.pk, "abc", "android")])
+
+        response = self.client.delete(self.url, {"token": "abc"}, content_type="application/json",
+                                      **auth_header(self.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(DeviceToken.objects.exists())
+
+    def test_token_moves_to_the_user_who_registered_it_last(self):
+        other = User.objects.create(username="other@example.com")
+        self.post(self.user, token="shared")
+        self.post(other, token="shared")
+
+        self.assertEqual(DeviceToken.objects.get(token="shared").user, other)
+
+        # Only the owner can unregister it
+        self.client.delete(self.url, {"token": "shared"}, content_type="application/json", **auth_header(self.user))
+        self.assertTrue(DeviceToken.objects.filter(token="shared").exists())
+
+    def test_token_is_required_and_so_is_a_login(self):
+        self.assertEqual(self.post(self.user).status_code, 400)
+        self.assertEqual(self.client.post(self.url, {"token": "abc"}, content_type="application/json").status_code, 401)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.admin = User.objects.create(username="admin@example.com", is_staff=True)
+
+    def middleware(self, **options):
+        with override_settings(PROFILING={"ENABLED": True, "ROOT": self.root, **options}):
+            return ProfilingMiddleware(lambda request: HttpResponse("ok"))
+
+    def request(self, token=None, url_name="seller_status"):
+        headers = {"HTTP_" + PROFILE_HEADER.upper().replace("-", "_"): token} if token else {}
+        request = RequestFactory().get("/api/", **headers)
+        request.resolver_match = mock.Mock(url_name=url_name, view_name=url_name)
+        return request
+
+    def test_disabled_middleware_removes_itself(self):
+        with override_settings(PROFILING={"ENABLED": False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: HttpResponse("ok"))
+
+    def test_signed_header_triggers_a_profile(self):
+        middleware = self.middleware()
+        self.assertEqual(middleware.trigger(self.request(make_profile_token(self.admin))), "header")
+        self.assertIsNone(middleware.trigger(self.request(make_profile_token(self.admin) + "x")))
+        self.assertIsNone(middleware.trigger(self.request("not-a-token")))
+        self.assertIsNone(middleware.trigger(self.request()))
+
+    def test_sampling(self):
+        middleware = self.middleware(SAMPLE_RATE=0.25)
+        with mock.patch("sellers.profiling.random.random", return_value=0.2):
+            self.assertEqual(middleware.trigger(self.request()), "sample")
+        with mock.patch("sellers.profiling.random.random", return_value=0.3):
+            self.assertIsNone(middleware.trigger(self.request()))
+
+    def test_slow_requests_are_kept_above_the_threshold(self):
+        middleware = self.middleware(SLOW_MS=50, SLOW_EXCLUDE=("seller_status_poll",))
+        self.assertEqual(middleware.trigger(self.request()), "slow")
+
+        def finish(duration_ms, url_name="seller_status"):
+            capture = mock.Mock(trigger="slow", duration_ms=duration_ms, profiler=None)
+            capture.as_record.return_value = {"kind": "sampled", "stacks": {}}
+            return middleware.finish(self.request(url_name=url_name), HttpResponse("ok"), capture)
+
+        self.assertFalse(finish(10).has_header("X-Profile-Id"))
+        self.assertTrue(finish(80).has_header("X-Profile-Id"))
+        self.assertFalse(finish(80, "seller_status_poll").has_header("X-Profile-Id"))
+        self.assertEqual(len(ProfileStore(self.root).list()), 1)
+
+    def test_download_of_a_trimmed_profile_is_404(self):
+        store = ProfileStore(self.root)
+        profile_id = store.save({"kind": "cprofile", "stacks": {}})
+        store.path(profile_id, ".prof").touch()
+
+        with mock.patch("sellers.views.get_profile_store", return_value=store):
+            url = f"/api/admin/profiles/{profile_id}/download/"
+            response = self.client.get(url, **auth_header(self.admin))
+            self.assertEqual(response.status_code, 200)
+            response.close()
+
+            store.path(profile_id, ".prof").unlink()
+            self.assertEqual(self.client.get(url, **auth_header(self.admin)).status_code, 404)
+
+
+class RevocationTests(TestCase):
+    def setUp(self):
+        # A fresh per-process list, so no state leaks in from other tests
+        patcher = mock.patch("sellers.revocation._revocations", RevocationList())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create(username="seller@example.com", password=make_password("secret"))
+        self.profile = SellerProfile.objects.create(user=self.user, factory_name="Factory", status="pending")
+        self.tokens = get_tokens_for_user(self.user)
+
+    def me(self, tokens=None):
+        access = (tokens or self.tokens)["access"]
+        return self.client.get("/api/user/me/", HTTP_AUTHORIZATION=f"Bearer {access}").status_code
+
+    def refresh(self, tokens=None):
+        return self.client.post(
+            "/api/auth/token/refresh/", {"refresh": (tokens or self.tokens)["refresh"]}, content_type="application/json"
+        )
+
+    def test_logout_all_rejects_earlier_tokens(self):
+        self.assertEqual(self.me(), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/logout-all/", HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.me(), 401)
+        self.assertEqual(self.refresh().status_code, 401)
+        self.assertEqual(self.me(get_tokens_for_user(self.user)), 200)
+
+    def test_password_reset_rejects_earlier_tokens(self):
+        PasswordResetOTP.objects.create(
+            email="seller@example.com", otp="123456", expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/reset-password/", {
+                "email": "seller@example.com", "otp": "123456", "password": "new-secret",
+            }, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.me(), 401)
+
+    def test_rejection_rejects_earlier_tokens(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.status = "rejected"
+            self.profile.save()
+
+        self.assertEqual(self.me(), 401)
+        self.assertEqual(self.me(get_tokens_for_user(self.user)), 200)
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        rotated = self.refresh()
+        self.assertEqual(rotated.status_code, 200)
+        new_tokens = rotated.json()["tokens"]
+
+        # Past the grace window a second use ends every session
+        RevokedToken.objects.update(created_at=timezone.now() - timedelta(seconds=revocation_options()["REUSE_GRACE"] + 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.refresh().status_code, 401)
+        self.assertEqual(self.me(new_tokens), 401)
+        self.assertEqual(self.refresh(new_tokens).status_code, 401)
+
+    def test_retry_within_the_grace_window_gets_a_new_pair(self):
+        first = self.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            retry = self.refresh()
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(self.me(first.json()["tokens"]), 200)
+        self.assertEqual(self.me(retry.json()["tokens"]), 200)
+
+    def test_other_processes_pick_up_revocations_on_sync(self):
+        other = RevocationList()
+        self.assertEqual(other.user_version(self.user.pk), 0)
+
+        # Revoked "in another worker": only the database changes
+        with mock.patch("sellers.revocation.transaction.on_commit"):
+            revoke_user(self.user.pk)
+        self.assertEqual(other.user_version(self.user.pk), 0)
+
+        other.sync()
+        self.assertEqual(other.user_version(self.user.pk), 1)
+
+
+class MaintenanceTests(TestCase):
+    def setUp(self):
+        expired = timezone.now() - timedelta(days=2)
+        self.otps = [EmailOTP.objects.create(email=f"otp{i}@example.com", otp="123456", expires_at=expired) for i in range(5)]
+        EmailOTP.objects.create(email="fresh@example.com", otp="123456", expires_at=timezone.now() + timedelta(minutes=5))
+        self.expired = EmailOTP.objects.filter(expires_at__lt=timezone.now() - timedelta(days=1))
+
+    def test_purge_walks_the_keys_in_batches(self):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            rows, batches = purge(self.expired, batch_size=2)
+
+        self.assertEqual((rows, batches), (5, 3))
+        self.assertEqual(list(EmailOTP.objects.values_list("email", flat=True)), ["fresh@example.com"])
+        # Every page after the first seeks past the previous one's last key
+        pages = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and "LIMIT" in q["sql"]]
+        self.assertEqual(len(pages), 3)
+        self.assertNotIn('"id" >', pages[0])
+        self.assertIn(f'"id" > {self.otps[1].pk}', pages[1])
+        self.assertIn(f'"id" > {self.otps[3].pk}', pages[2])
+
+    def test_purge_keeps_rows_that_changed_after_selection(self):
+        renewed = self.otps[0]
+
+        def renew_after_first_page(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if "LIMIT" in sql and not getattr(renew_after_first_page, "done", False):
+                renew_after_first_page.done = True
+                EmailOTP.objects.filter(pk=renewed.pk).update(expires_at=timezone.now() + timedelta(minutes=5))
+            return result
+
+        deleted_keys = []
+        with connections["default"].execute_wrapper(renew_after_first_page):
+            rows, _ = purge(self.expired, batch_size=10, after_delete=deleted_keys.extend)
+
+        self.assertEqual(rows, 4)
+        self.assertTrue(EmailOTP.objects.filter(pk=renewed.pk).exists())
+        self.assertEqual(sorted(deleted_keys), [otp.pk for otp in self.otps[1:]])
+
+    def test_dry_run_only_counts(self):
+        results = run_maintenance(tasks=["email_otps"], dry_run=True)
+
+        self.assertEqual([(r["task"], r["rows"], r["batches"]) for r in results], [("email_otps", 5, 0)])
+        self.assertEqual(EmailOTP.objects.count(), 6)
+        self.assertFalse(MaintenanceRun.objects.exists())
+
+        run_maintenance(tasks=["email_otps"])
+        self.assertEqual(EmailOTP.objects.count(), 1)
+        self.assertEqual(MaintenanceRun.objects.get().rows, 5)
+
+    def test_abandoned_uploads_are_keyed_on_last_activity(self):
+        user = User.objects.create(username="seller@example.com")
+        seller = SellerProfile.objects.create(user=user, factory_name="Factory")
+        now = timezone.now()
+
+        def session(status, idle):
+            upload = UploadSession.objects.create(seller=seller, doc_type="gst", filename="gst.pdf", size=10, status=status)
+            UploadSession.objects.filter(pk=upload.pk).update(created_at=now - timedelta(days=10), updated_at=now - idle)
+            return upload.pk
+
+        stale = session("open", timedelta(days=3))
+        active = session("open", timedelta(hours=1))
+        dead_claim = session("assembling", timedelta(days=3))
+        live_claim = session("assembling", timedelta(minutes=1))
+
+        store = mock.Mock()
+        with mock.patch("sellers.maintenance.get_chunk_store", return_value=store):
+            run_maintenance(tasks=["upload_sessions"])
+            self.assertEqual(set(UploadSession.objects.values_list("pk", flat=True)), {active, live_claim})
+            self.assertEqual({c.args[0] for c in store.discard.call_args_list}, {stale, dead_claim})
+
+            # Even with no TTL at all a running complete is left alone
+            run_maintenance(tasks=["upload_sessions"], options={"UPLOAD_SESSION_TTL": timedelta(0)})
+            self.assertEqual(list(UploadSession.objects.values_list("pk", flat=True)), [live_claim])
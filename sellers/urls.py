@@ -4,6 +4,8 @@ from . import views
 urlpatterns = [
     path("auth/signup/", views.signup, name="signup"),
     path("auth/login/", views.login, name="login"),
+    path("auth/token/refresh/", views.refresh_tokens, name="token_refresh"),
+    path("auth/logout-all/", views.logout_all, name="logout_all"),
     path("user/me/", views.user_me, name="user_me"),
     path("seller/update/<int:user_id>/", views.update_seller_profile, name="update_seller_profile"),
     path("auth/send-otp/", views.send_otp, name="send-otp"),
@@ -12,8 +14,21 @@ urlpatterns = [
     path("auth/verify-reset-otp/", views.verify_reset_otp, name="verify-reset-otp"),
     path("auth/reset-password/", views.reset_password, name="reset-password"),
     path("auth/delete-user/<int:user_id>/", views.delete_user, name="delete_user"),
+    path("admin/deletions/<uuid:job_id>/", views.deletion_status, name="deletion_status"),
     path("seller/upload-doc/", views.upload_doc, name="upload_doc"),
+    path("seller/uploads/", views.create_upload, name="create_upload"),
+    path("seller/uploads/<uuid:upload_id>/", views.upload_chunk, name="upload_chunk"),
+    path("seller/uploads/<uuid:upload_id>/complete/", views.complete_upload, name="complete_upload"),
     path("seller/status/<int:user_id>/", views.status_view, name="seller_status"),
+    path("seller/documents/<int:user_id>/", views.seller_documents, name="seller_documents"),
+    path("seller/status/<int:user_id>/stream/", views.status_stream, name="seller_status_stream"),
+    path("seller/status/<int:user_id>/poll/", views.status_poll, name="seller_status_poll"),
+    path("seller/devices/", views.device_tokens, name="device_tokens"),
     path("seller/update-status/", views.update_status, name="update_status"),
     path("admin/approve/<int:user_id>/", views.admin_approve, name="admin_approve"),
+    path("admin/stats/", views.admin_stats, name="admin_stats"),
+    path("admin/profiles/", views.admin_profiles, name="admin_profiles"),
+    path("admin/profiles/token/", views.admin_profile_token, name="admin_profile_token"),
+    path("admin/profiles/<uuid:profile_id>/", views.admin_profile_detail, name="admin_profile_detail"),
+    path("admin/profiles/<uuid:profile_id>/download/", views.download_profile, name="download_profile"),
 ]
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+COPY_BUFFER = 1024 * 1024
+
+
+class ChunkChecksumMismatch(Exception):
+    pass
+
+
+class IncompleteUpload(Exception):
+    pass
+
+
+class LocalChunkStore:
+    """
+    Stages chunks of a resumable upload on local disk.
+
+    Every chunk is written to its own file named after its byte offset, so
+    chunks may arrive in any order and in parallel. A re-sent chunk simply
+    replaces the previous copy of the same offset.
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.path.join(tempfile.gettempdir(), "seller_uploads"))
+
+    def _session_dir(self, session_id):
+        return self.root / str(session_id)
+
+    def write_chunk(self, session_id, offset, stream, length, checksum=None):
+        session_dir = self._session_dir(session_id)
+        session_dir.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        written = 0
+        fd, tmp_path = tempfile.mkstemp(dir=session_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while written < length:
+                    block = stream.read(min(COPY_BUFFER, length - written))
+                    if not block:
+                        break
+                    out.write(block)
+                    digest.update(block)
+                    written += len(block)
+
+            if written != length:
+                raise IncompleteUpload(f"Expected {length} bytes, received {written}")
+            if checksum and digest.hexdigest() != checksum.lower():
+                raise ChunkChecksumMismatch("Chunk checksum does not match")
+
+            # Atomic rename so concurrent readers never see a half-written chunk
+            os.replace(tmp_path, session_dir / f"{offset}.part")
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return written
+
+    def chunks(self, session_id):
+        """Return ``(offset, length, path)`` for every staged chunk, sorted by offset."""
+        session_dir = self._session_dir(session_id)
+        if not session_dir.exists():
+            return []
+
+        parts = []
+        for entry in os.scandir(session_dir):
+            if not entry.name.endswith(".part"):
+                continue
+            offset = int(entry.name[:-len(".part")])
+            parts.append((offset, entry.stat().st_size, entry.path))
+        parts.sort()
+        return parts
+
+    def received_ranges(self, session_id):
+        """Merge staged chunks into contiguous ``[start, end)`` byte ranges."""
+        ranges = []
+        for offset, length, _ in self.chunks(session_id):
+            end = offset + length
+            if ranges and offset <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], end)
+            else:
+                ranges.append([offset, end])
+        return [tuple(r) for r in ranges]
+
+    def assemble(self, session_id, total_size):
+        """
+        Concatenate the staged chunks into a single file and return its path.
+
+        Uses ``os.copy_file_range`` so the bytes are copied inside the kernel
+        without passing through Python, falling back to a buffered copy where
+        the syscall is unavailable. Overlapping chunks are trimmed.
+        """
+        if self.received_ranges(session_id) != [(0, total_size)]:
+            raise IncompleteUpload("Upload is missing chunks")
+
+        target = self._session_dir(session_id) / "assembled"
+        position = 0
+        with open(target, "wb") as out:
+            for offset, length, path in self.chunks(session_id):
+                skip = position - offset
+                if skip >= length:
+                    continue
+                with open(path, "rb") as src:
+                    _copy_range(src, out, skip, length - skip)
+                position = offset + length
+
+        return target
+
+    def discard(self, session_id):
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+
+def _copy_range(src, dst, start, count):
+    dst.flush()
+    if hasattr(os, "copy_file_range"):
+        try:
+            while count > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), count, start)
+                if copied == 0:
+                    break
+                start += copied
+                count -= copied
+            return
+        except OSError:
+            pass  # e.g. cross-filesystem copy on older kernels
+
+    src.seek(start)
+    while count > 0:
+        block = src.read(min(COPY_BUFFER, count))
+        if not block:
+            break
+        dst.write(block)
+        count -= len(block)
+
+
+_store = None
+
+
+def get_chunk_store():
+    global _store
+    if _store is None:
+        config = getattr(settings, "CHUNKED_UPLOAD", {})
+        backend = import_string(config.get("BACKEND", "sellers.utils.chunked_upload.LocalChunkStore"))
+        _store = backend(config.get("ROOT"))
+    return _store
@@ -1,6 +1,8 @@
 from azure.communication.email import EmailClient
 from django.conf import settings
 
+from ..profiling import span
+
 def send_acs_email(to_email, subject, html_content, plain_text=""):
     client = EmailClient.from_connection_string(settings.ACS_CONNECTION_STRING)
 
@@ -16,6 +18,7 @@ def send_acs_email(to_email, subject, html_content, plain_text=""):
         }
     }
 
-    poller = client.begin_send(message)
-    result = poller.result()
+    with span("acs.email.send", subject=subject):
+        poller = client.begin_send(message)
+        result = poller.result()
     return result
@@ -1,20 +1,38 @@
+import asyncio
+import json
 import random
 from datetime import timedelta
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Q
+from django.core.files import File
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import SellerProfile, Document, EmailOTP, PasswordResetOTP
-from .serializers import SellerProfileSerializer, DocumentSerializer
+from backend.db_router import pin_user
+from .models import SellerProfile, Document, EmailOTP, PasswordResetOTP, UploadSession, StatusCounter, DeviceToken, DeletionJob
+from .serializers import SellerProfileSerializer, DocumentSerializer, sparse_params
+from .pagination import DocumentCursorPagination
 from .utils.email_service import send_acs_email
+from .events import get_status_broker
+from .idempotency import idempotent, idempotency_stats
+from .maintenance import maintenance_stats
+from .deletion import pending_deletion, schedule_deletion, users_pending_deletion
+from .utils.chunked_upload import get_chunk_store, ChunkChecksumMismatch, IncompleteUpload
+from .revocation import get_revocation_list, issue_tokens, reused_within_grace, revoke_token, revoke_user
+from .profiling import HEADER as PROFILE_HEADER, get_options as profiling_options, get_profile_store, make_profile_token, span
 
 
 # ======================================================================
@@ -22,7 +40,9 @@ from .utils.email_service import send_acs_email
 # ======================================================================
 
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = issue_tokens(user)
+    # The client's next reads should see whatever this request just wrote
+    pin_user(user.pk)
     return {"refresh": str(refresh), "access": str(refresh.access_token)}
 
 def generate_otp():
@@ -39,6 +59,31 @@ def send_email_otp(email, otp, subject="OTP Verification", name="User", template
         plain_text=plain_text
     )
 
+def serialize_profile(request, queryset, always=()):
+    """
+    Fetch one profile and serialize it honouring ``?fields=`` / ``?expand=``.
+    Only the requested columns (plus ``always``) are selected and documents
+    are prefetched only when they will be rendered.
+    """
+    fields, expand = sparse_params(request)
+    serializer = SellerProfileSerializer(fields=fields, expand=expand)
+    queryset = serializer.project(queryset)
+    if serializer.sparse and always:
+        queryset = queryset.only(*serializer.model_columns(), *always)
+
+    profile = queryset.first()
+    if profile is None:
+        return None, None
+    serializer.instance = profile
+    return profile, serializer.data
+
+def submit_for_review(profile, actor=None):
+    if profile.status.lower() in ["rejected", "new"]:
+        profile.status = "pending"
+        profile.admin_comment = ""
+        profile._status_actor = actor
+        profile.save()
+
 
 # ======================================================================
 # SIGNUP
@@ -46,6 +91,7 @@ def send_email_otp(email, otp, subject="OTP Verification", name="User", template
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@idempotent
 def signup(request):
     email = request.data.get("email")
     phone = request.data.get("mobile")
@@ -56,27 +102,60 @@ def signup(request):
     if not email or not phone or not password:
         return Response({"detail": "Email, mobile, and password are required"}, status=400)
 
-    if User.objects.filter(username=email).exists():
-        return Response({"detail": "User already exists"}, status=400)
+    # Hash before opening the transaction so it isn't held open meanwhile
+    password_hash = make_password(password)
+    otp = generate_otp()
+    expires_at = timezone.now() + timedelta(minutes=10)
 
-    user = User.objects.create_user(
-        username=email, email=email, password=password, first_name=owner_name, is_active=False
-    )
+    # One transaction, no exists() pre-check: the unique username constraint
+    # decides concurrent signups for the same email.
+    try:
+        with transaction.atomic():
+            user = User.objects.create(
+                username=User.normalize_username(email),
+                email=User.objects.normalize_email(email),
+                password=password_hash,
+                first_name=owner_name,
+                is_active=False,
+            )
+
+            profile = SellerProfile.objects.create(
+                user=user,
+                factory_name=factory_name,
+                mobile=phone,
+                gstin=request.data.get("gstin", ""),
+                iec=request.data.get("iec", ""),
+                address=request.data.get("address", "")
+            )
+
+            EmailOTP.objects.create(email=email, otp=otp, expires_at=expires_at)
+    except IntegrityError:
+        return signup_conflict(email, password, owner_name)
 
-    profile = SellerProfile.objects.create(
-        user=user,
-        factory_name=factory_name,
-        mobile=phone,
-        gstin=request.data.get("gstin", ""),
-        iec=request.data.get("iec", ""),
-        address=request.data.get("address", "")
-    )
+    send_email_otp(email, otp, name=owner_name)
+
+    return Response({"userId": profile.id, "detail": "OTP sent to email"}, status=201)
+
+
+def signup_conflict(email, password, owner_name):
+    """
+    The email is already registered. A retried signup (same password, not yet
+    verified) just gets a fresh OTP; anything else is rejected as before.
+    """
+    user = User.objects.filter(username=email).select_related("seller_profile").first()
+    if user is None or user.is_active or not user.check_password(password) or pending_deletion(user.pk):
+        return Response({"detail": "User already exists"}, status=400)
+
+    try:
+        profile = user.seller_profile
+    except SellerProfile.DoesNotExist:
+        return Response({"detail": "User already exists"}, status=400)
 
     otp = generate_otp()
     EmailOTP.objects.create(email=email, otp=otp, expires_at=timezone.now() + timedelta(minutes=10))
     send_email_otp(email, otp, name=owner_name)
 
-    return Response({"userId": profile.id, "detail": "OTP sent to email"}, status=201)
+    return Response({"userId": profile.id, "detail": "OTP sent to email"}, status=200)
 
 
 # ======================================================================
@@ -110,12 +189,53 @@ def login(request):
     })
 
 
+# ======================================================================
+# TOKEN REFRESH (ROTATING) / LOGOUT
+# ======================================================================
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def refresh_tokens(request):
+    raw_token = request.data.get("refresh")
+    if not raw_token:
+        return Response({"detail": "Refresh token required"}, status=400)
+
+    try:
+        refresh = RefreshToken(raw_token)
+    except TokenError:
+        return Response({"detail": "Invalid or expired refresh token"}, status=401)
+
+    if get_revocation_list().is_revoked(refresh):
+        return Response({"detail": "Token has been revoked"}, status=401)
+
+    user = User.objects.filter(pk=refresh[jwt_settings.USER_ID_CLAIM], is_active=True).first()
+    if user is None:
+        return Response({"detail": "User not found"}, status=401)
+
+    # Each refresh token works once. A retry right after rotating gets a new
+    # pair; seeing one again later means it was copied, so every session of
+    # the user is ended.
+    if not revoke_token(refresh) and not reused_within_grace(refresh):
+        revoke_user(user.pk)
+        return Response({"detail": "Token has been revoked"}, status=401)
+
+    return Response({"tokens": get_tokens_for_user(user)})
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def logout_all(request):
+    revoke_user(request.user.pk)
+    return Response({"detail": "Logged out of all sessions"})
+
+
 # ======================================================================
 # USER PROFILE UPDATE
 # ======================================================================
 
 @api_view(["PATCH"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def update_seller_profile(request, user_id):
     try:
         profile = SellerProfile.objects.get(id=user_id, user=request.user)
@@ -137,11 +257,7 @@ def update_seller_profile(request, user_id):
 @permission_classes([IsAuthenticated])
 def user_me(request):
     user = request.user
-    try:
-        profile = user.seller_profile
-        profile_data = SellerProfileSerializer(profile).data
-    except SellerProfile.DoesNotExist:
-        profile_data = None
+    _, profile_data = serialize_profile(request, SellerProfile.objects.filter(user=user))
 
     return Response({
         "id": user.id,
@@ -159,11 +275,16 @@ def user_me(request):
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@idempotent
 def send_otp(request):
     email = request.data.get("email")
     if not email:
         return Response({"detail": "Email is required"}, status=400)
 
+    user = User.objects.filter(username=email).first()
+    if user is not None and pending_deletion(user.pk):
+        return Response({"detail": "User not found"}, status=404)
+
     otp_code = generate_otp()
     EmailOTP.objects.update_or_create(
         email=email,
@@ -195,6 +316,8 @@ def verify_otp(request):
     if otp_obj.is_valid(otp_input):
         try:
             user = User.objects.get(username=email)
+            if pending_deletion(user.pk):
+                raise User.DoesNotExist
             user.is_active = True
             user.save()
         except User.DoesNotExist:
@@ -212,15 +335,15 @@ def verify_otp(request):
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@idempotent
 def forgot_password(request):
     email = request.data.get("email")
 
     if not email:
         return Response({"detail": "Email is required"}, status=400)
 
-    try:
-        user = User.objects.get(username=email)
-    except User.DoesNotExist:
+    user = User.objects.filter(username=email).first()
+    if user is None or pending_deletion(user.pk):
         return Response({"detail": "User not found"}, status=404)
 
     otp = generate_otp()
@@ -288,8 +411,11 @@ def reset_password(request):
 
     try:
         user = User.objects.get(username=email)
+        if pending_deletion(user.pk):
+            raise User.DoesNotExist
         user.set_password(new_password)
         user.save()
+        revoke_user(user.pk)
         return Response({"detail": "Password reset successful"})
     except User.DoesNotExist:
         return Response({"detail": "User not found"}, status=404)
@@ -302,20 +428,19 @@ def reset_password(request):
 @api_view(["POST"])
 @parser_classes([MultiPartParser, FormParser])
 @permission_classes([IsAuthenticated])
+@idempotent
 def upload_doc(request):
     try:
         profile = request.user.seller_profile
     except SellerProfile.DoesNotExist:
         return Response({"detail": "Seller profile not found"}, status=404)
 
-    if profile.status.lower() in ["rejected", "new"]:
-        profile.status = "pending"
-        profile.admin_comment = ""
-        profile.save()
+    submit_for_review(profile, actor=request.user)
 
     uploaded_docs = []
     for key, file in request.FILES.items():
-        doc = Document.objects.create(seller=profile, doc_type=key, file=file)
+        with span("storage.save", doc_type=key, size=file.size):
+            doc = Document.objects.create(seller=profile, doc_type=key, file=file)
         uploaded_docs.append(DocumentSerializer(doc).data)
 
     return Response({
@@ -325,6 +450,148 @@ def upload_doc(request):
     })
 
 
+# ======================================================================
+# RESUMABLE (CHUNKED) UPLOAD
+# ======================================================================
+
+def upload_progress(session):
+    ranges = get_chunk_store().received_ranges(session.id)
+    return {
+        "uploadId": str(session.id),
+        "doc_type": session.doc_type,
+        "filename": session.filename,
+        "size": session.size,
+        "received": sum(end - start for start, end in ranges),
+        "ranges": ranges,
+        "status": session.status,
+    }
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@idempotent
+def create_upload(request):
+    try:
+        profile = request.user.seller_profile
+    except SellerProfile.DoesNotExist:
+        return Response({"detail": "Seller profile not found"}, status=404)
+
+    doc_type = request.data.get("doc_type")
+    filename = request.data.get("filename")
+    try:
+        size = int(request.data.get("size", 0))
+    except (TypeError, ValueError):
+        size = 0
+
+    if not doc_type or not filename or size <= 0:
+        return Response({"detail": "doc_type, filename, and size are required"}, status=400)
+
+    upload_settings = getattr(settings, "CHUNKED_UPLOAD", {})
+    if size > upload_settings.get("MAX_SIZE", 50 * 1024 * 1024):
+        return Response({"detail": "File too large"}, status=413)
+
+    session = UploadSession.objects.create(seller=profile, doc_type=doc_type, filename=filename, size=size)
+
+    data = upload_progress(session)
+    data["chunkSize"] = upload_settings.get("CHUNK_SIZE", 1024 * 1024)
+    return Response(data, status=201)
+
+
+@api_view(["GET", "PUT"])
+@permission_classes([IsAuthenticated])
+def upload_chunk(request, upload_id):
+    try:
+        session = UploadSession.objects.get(id=upload_id, seller__user=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({"detail": "Upload not found"}, status=404)
+
+    if request.method == "GET":
+        return Response(upload_progress(session))
+
+    if session.status == "assembling":
+        return Response({"detail": "Upload is being completed"}, status=409)
+    if session.status != "open":
+        return Response({"detail": "Upload already completed"}, status=409)
+
+    try:
+        offset = int(request.META.get("HTTP_UPLOAD_OFFSET", ""))
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return Response({"detail": "Upload-Offset header is required"}, status=400)
+
+    checksum = request.META.get("HTTP_UPLOAD_CHECKSUM")
+    if not checksum:
+        return Response({"detail": "Upload-Checksum header is required"}, status=400)
+
+    if offset < 0 or length <= 0 or offset + length > session.size:
+        return Response({"detail": "Chunk is outside the declared file size"}, status=416)
+
+    try:
+        get_chunk_store().write_chunk(session.id, offset, request.stream, length, checksum)
+    except ChunkChecksumMismatch:
+        return Response({"detail": "Checksum mismatch"}, status=422)
+    except IncompleteUpload:
+        return Response({"detail": "Chunk body truncated"}, status=400)
+
+    UploadSession.objects.filter(id=session.id, status="open").update(updated_at=timezone.now())
+    return Response(upload_progress(session))
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@idempotent
+def complete_upload(request, upload_id):
+    try:
+        session = UploadSession.objects.select_related("seller").get(id=upload_id, seller__user=request.user)
+    except UploadSession.DoesNotExist:
+        return Response({"detail": "Upload not found"}, status=404)
+
+    # Claim the session so a retried or concurrent complete can't assemble
+    # the same chunks twice. A claim whose worker died is taken over once it
+    # is older than CLAIM_TIMEOUT.
+    now = timezone.now()
+    claim_timeout = timedelta(seconds=getattr(settings, "CHUNKED_UPLOAD", {}).get("CLAIM_TIMEOUT", 15 * 60))
+    claimable = Q(status="open") | Q(status="assembling", updated_at__lt=now - claim_timeout)
+    claimed = UploadSession.objects.filter(claimable, id=session.id).update(status="assembling", updated_at=now)
+    if not claimed:
+        session.refresh_from_db(fields=["status", "document"])
+        if session.status == "complete":
+            return Response({"status": session.seller.status, "document": DocumentSerializer(session.document).data})
+        return Response({"detail": "Upload is already being completed", "status": session.status}, status=409)
+
+    store = get_chunk_store()
+    try:
+        try:
+            with span("uploads.assemble", size=session.size):
+                assembled = store.assemble(session.id, session.size)
+        except IncompleteUpload:
+            UploadSession.objects.filter(id=session.id).update(status="open", updated_at=timezone.now())
+            session.status = "open"
+            return Response({"detail": "Upload is missing chunks", **upload_progress(session)}, status=409)
+
+        profile = session.seller
+        submit_for_review(profile, actor=request.user)
+
+        with open(assembled, "rb") as fh, span("storage.save", doc_type=session.doc_type, size=session.size):
+            doc = Document.objects.create(seller=profile, doc_type=session.doc_type, file=File(fh, name=session.filename))
+    except Exception:
+        # Release the claim so the client can retry
+        UploadSession.objects.filter(id=session.id).update(status="open", updated_at=timezone.now())
+        raise
+
+    session.status = "complete"
+    session.document = doc
+    session.updated_at = timezone.now()
+    session.save(update_fields=["status", "document", "updated_at"])
+    store.discard(session.id)
+
+    return Response({
+        "message": "Document uploaded successfully",
+        "status": profile.status,
+        "document": DocumentSerializer(doc).data
+    })
+
+
 # ======================================================================
 # STATUS VIEW FOR FRONTEND
 # ======================================================================
@@ -332,13 +599,15 @@ def upload_doc(request):
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def status_view(request, user_id):
-    try:
-        profile = SellerProfile.objects.get(user__id=user_id)
-    except SellerProfile.DoesNotExist:
+    # Accounts being deleted are already gone as far as callers can tell
+    profile, data = serialize_profile(
+        request,
+        SellerProfile.objects.filter(user__id=user_id).exclude(user_id__in=users_pending_deletion()),
+        always=("status", "admin_comment"),
+    )
+    if profile is None:
         return Response({"detail": "Not found"}, status=404)
 
-    data = SellerProfileSerializer(profile).data
-
     return Response({
         "status": profile.status,
         "admin_comment": profile.admin_comment,
@@ -346,17 +615,152 @@ def status_view(request, user_id):
     })
 
 
+# ======================================================================
+# SELLER DOCUMENTS (PAGINATED)
+# ======================================================================
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def seller_documents(request, user_id):
+    """
+    Latest document of each type by default; ``?history=true`` lists every
+    upload. Filter with ``?doc_type=``, page with the returned cursors.
+    """
+    if request.user.id != user_id and not request.user.is_staff:
+        return Response({"detail": "Not found"}, status=404)
+
+    documents = Document.objects.filter(seller__user__id=user_id)
+    doc_type = request.query_params.get("doc_type")
+    if doc_type:
+        documents = documents.filter(doc_type=doc_type)
+
+    if request.query_params.get("history", "").lower() not in ("1", "true", "yes"):
+        latest_ids = documents.order_by().values("doc_type").annotate(latest=Max("id")).values("latest")
+        documents = documents.filter(id__in=latest_ids)
+
+    fields, _ = sparse_params(request)
+    serializer = DocumentSerializer(fields=fields)
+    paginator = DocumentCursorPagination()
+    page = paginator.paginate_queryset(serializer.project(documents), request)
+
+    data = DocumentSerializer(page, many=True, fields=fields).data
+    return paginator.get_paginated_response(data)
+
+
+# ======================================================================
+# STATUS STREAM (SSE) + LONG-POLL FALLBACK
+# ======================================================================
+# Plain async Django views: under ASGI an idle waiter is just a suspended
+# coroutine instead of a blocked worker thread.
+
+async def fetch_status(user_id):
+    profiles = SellerProfile.objects.filter(user__id=user_id).exclude(user_id__in=users_pending_deletion())
+    return await profiles.values("status", "admin_comment").afirst()
+
+
+def sse_message(state, event="status"):
+    return f"event: {event}\ndata: {json.dumps(state)}\n\n"
+
+
+async def status_stream(request, user_id):
+    options = getattr(settings, "STATUS_EVENTS", {})
+    broker = get_status_broker()
+
+    # Subscribe before reading the current state so no change can slip in between
+    queue = broker.subscribe(user_id)
+    state = await fetch_status(user_id)
+    if state is None:
+        broker.unsubscribe(user_id, queue)
+        return JsonResponse({"detail": "Not found"}, status=404)
+
+    async def events():
+        deadline = asyncio.get_running_loop().time() + options.get("STREAM_TIMEOUT", 300)
+        try:
+            yield f"retry: {options.get('RETRY_MS', 3000)}\n"
+            yield sse_message(state)
+            while asyncio.get_running_loop().time() < deadline:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=options.get("HEARTBEAT", 15))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if "status" not in event:
+                    event = await fetch_status(user_id)
+                    if event is None:
+                        yield sse_message({"detail": "Not found"}, event="gone")
+                        return
+                yield sse_message(event)
+        finally:
+            broker.unsubscribe(user_id, queue)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def status_poll(request, user_id):
+    """
+    Long-poll fallback: returns as soon as the status differs from the
+    ``?status=`` the client already knows, or after the poll timeout.
+    """
+    options = getattr(settings, "STATUS_EVENTS", {})
+    broker = get_status_broker()
+    known = request.GET.get("status")
+
+    queue = broker.subscribe(user_id)
+    try:
+        state = await fetch_status(user_id)
+        if state is None:
+            return JsonResponse({"detail": "Not found"}, status=404)
+
+        if known and state["status"] == known:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=options.get("LONG_POLL_TIMEOUT", 25))
+                state = event if "status" in event else await fetch_status(user_id) or state
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+    return JsonResponse(state)
+
+
+# ======================================================================
+# PUSH NOTIFICATION DEVICES
+# ======================================================================
+
+@api_view(["POST", "DELETE"])
+@permission_classes([IsAuthenticated])
+def device_tokens(request):
+    token = request.data.get("token")
+    if not token:
+        return Response({"detail": "Token is required"}, status=400)
+
+    if request.method == "DELETE":
+        DeviceToken.objects.filter(user=request.user, token=token).delete()
+        return Response({"message": "Device unregistered"})
+
+    _, created = DeviceToken.objects.update_or_create(
+        token=token,
+        defaults={"user": request.user, "platform": request.data.get("platform", "")},
+    )
+    return Response({"message": "Device registered"}, status=201 if created else 200)
+
+
 # ======================================================================
 # UPDATE STATUS
 # ======================================================================
 
 @api_view(["PATCH"])
 @permission_classes([IsAuthenticated])
+@idempotent
 def update_status(request):
     try:
         profile = request.user.seller_profile
         new_status = request.data.get("status", "pending")
         profile.status = new_status
+        profile._status_actor = request.user
         profile.save()
 
         return Response({"message": f"Status updated to {profile.status}"})
@@ -370,14 +774,60 @@ def update_status(request):
 
 @api_view(["DELETE"])
 @permission_classes([IsAdminUser])
+@idempotent
 def delete_user(request, user_id):
-    try:
-        user = User.objects.get(pk=user_id)
-    except User.DoesNotExist:
-        return Response({"detail": "User not found"}, status=404)
+    # The account is disabled and its tokens revoked right away; documents,
+    # stored files and the rows themselves are removed by a background job.
+    with transaction.atomic():
+        # Locking the user makes concurrent requests wait here and then find
+        # the first one's job instead of queuing a second
+        try:
+            user = User.objects.select_for_update().get(pk=user_id)
+        except User.DoesNotExist:
+            return Response({"detail": "User not found"}, status=404)
+
+        job = DeletionJob.objects.filter(user_id=user.pk).exclude(status="done").first()
+        if job is None:
+            user.is_active = False
+            user.save(update_fields=["is_active"])
+            revoke_user(user.pk)
+            job = DeletionJob.objects.create(user_id=user.pk, username=user.username, requested_by=request.user)
+            schedule_deletion(job)
+
+    return Response({
+        "message": f"User {user_id} scheduled for deletion",
+        "jobId": str(job.pk),
+        "status": job.status,
+    }, status=202)
+
+
+def deletion_progress(job):
+    return {
+        "jobId": str(job.pk),
+        "userId": job.user_id,
+        "username": job.username,
+        "status": job.status,
+        "attempts": job.attempts,
+        "documents_total": job.documents_total,
+        "documents_deleted": job.documents_deleted,
+        "files_deleted": job.files_deleted,
+        "files_failed": job.files_failed,
+        "failed_files": job.failed_files,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
 
-    user.delete()
-    return Response({"message": f"User {user_id} deleted successfully"})
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def deletion_status(request, job_id):
+    try:
+        job = DeletionJob.objects.get(pk=job_id)
+    except DeletionJob.DoesNotExist:
+        return Response({"detail": "Deletion job not found"}, status=404)
+    return Response(deletion_progress(job))
 
 
 # ======================================================================
@@ -386,17 +836,22 @@ def delete_user(request, user_id):
 
 @api_view(["POST"])
 @permission_classes([IsAdminUser])
+@idempotent
 def admin_approve(request, user_id):
     try:
         profile = SellerProfile.objects.get(user__id=user_id)
     except SellerProfile.DoesNotExist:
         return Response({"detail": "Not found"}, status=404)
 
+    if pending_deletion(user_id):
+        return Response({"detail": "User is being deleted"}, status=409)
+
     status_val = request.data.get("status", "approved")
     comment = request.data.get("admin_comment", "")
 
     profile.status = status_val
     profile.admin_comment = comment
+    profile._status_actor = request.user
     profile.save()
 
     return Response({
@@ -404,3 +859,84 @@ def admin_approve(request, user_id):
         "status": profile.status,
         "admin_comment": profile.admin_comment
     })
+
+
+# ======================================================================
+# ADMIN DASHBOARD STATS
+# ======================================================================
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def admin_stats(request):
+    counters = list(StatusCounter.objects.all())
+
+    review_time = {}
+    for counter in counters:
+        if counter.wait_samples:
+            review_time[counter.status] = {
+                "samples": counter.wait_samples,
+                "avg_seconds": counter.total_wait_seconds / counter.wait_samples,
+            }
+
+    return Response({
+        "total": sum(c.count for c in counters),
+        "counts": {c.status: c.count for c in counters},
+        "entered": {c.status: c.entered for c in counters},
+        "review_time": review_time,
+        "idempotency": idempotency_stats(),
+        "maintenance": maintenance_stats(),
+    })
+
+
+# ======================================================================
+# REQUEST PROFILES
+# ======================================================================
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def admin_profile_token(request):
+    options = profiling_options()
+    return Response({
+        "enabled": options["ENABLED"],
+        "header": PROFILE_HEADER,
+        "token": make_profile_token(request.user),
+        "expires_in": options["TOKEN_MAX_AGE"],
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def admin_profiles(request):
+    return Response({"results": get_profile_store().list()})
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def admin_profile_detail(request, profile_id):
+    record = get_profile_store().get(profile_id)
+    if record is None:
+        return Response({"detail": "Profile not found"}, status=404)
+    return Response(record)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def download_profile(request, profile_id):
+    """The pstats dump for cProfile captures, folded stacks for sampled ones."""
+    store = get_profile_store()
+    record = store.get(profile_id)
+    if record is None:
+        return Response({"detail": "Profile not found"}, status=404)
+
+    if record["kind"] == "cprofile":
+        try:
+            dump = open(store.path(profile_id, ".prof"), "rb")
+        except FileNotFoundError:
+            # Trimmed between reading the record and opening the dump
+            return Response({"detail": "Profile not found"}, status=404)
+        return FileResponse(dump, as_attachment=True, filename=f"{profile_id}.prof")
+
+    folded = "".join(f"{stack} {count}\n" for stack, count in record["stacks"].items())
+    response = HttpResponse(folded, content_type="text/plain")
+    response["Content-Disposition"] = f'attachment; filename="{profile_id}.folded"'
+    return response
@@ -1,3 +1,3 @@
 #!/bin/bash
 
-gunicorn backend.wsgi:application --bind=0.0.0.0:${PORT}
+gunicorn backend.asgi:application -k uvicorn_worker.UvicornWorker --bind=0.0.0.0:${PORT}